@@ -2,380 +2,508 @@
 Database configuration and initialization
 """
 import os
+import asyncio
 import aiosqlite
+from aiosqlitepool import SQLiteConnectionPool
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
 
 # Database configuration
 DB_PATH = os.getenv("DATABASE_PATH", "./data/scripts.db")
 Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
 
+# Connection pool configuration
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "25"))
+
+# Read-only connections kept apart from the main pool, so read endpoints
+# never wait for a connection behind slow writes
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+
+# Prepared statements kept per pooled connection (sqlite3 LRU, keyed by SQL text)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+
+# Prefetch the database into memory at startup (set WARMUP_DB=0 to disable)
+WARMUP_DB = os.getenv("WARMUP_DB", "1") == "1"
+
+# Per-connection PRAGMAs. journal_mode=WAL is persisted in the database file
+# by init_db, the rest must be applied to every new connection.
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA busy_timeout = 5000",
+)
+
+_pool: Optional[SQLiteConnectionPool] = None
+_read_pool: Optional[SQLiteConnectionPool] = None
+
+# Bumped after every commit that changes the script catalogue (scripts, their
+# tags or status), so cached listings can tell they are out of date
+_catalog_version = 0
+
+
+def sql_timestamp() -> str:
+    """Current UTC time formatted like SQLite's CURRENT_TIMESTAMP"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def catalog_version() -> int:
+    """Current version of the script catalogue"""
+    return _catalog_version
+
+
+def bump_catalog_version():
+    """Invalidate results cached against the script catalogue"""
+    global _catalog_version
+    _catalog_version += 1
+
+
+async def configure_connection(db: aiosqlite.Connection):
+    """Apply the per-connection PRAGMAs"""
+    for pragma in CONNECTION_PRAGMAS:
+        await db.execute(pragma)
+
+
+async def _connect() -> aiosqlite.Connection:
+    """Open a new pooled database connection"""
+    db = await aiosqlite.connect(DB_PATH, cached_statements=DB_STATEMENT_CACHE_SIZE)
+    await configure_connection(db)
+    db.row_factory = aiosqlite.Row
+    return db
+
+
+async def _connect_readonly() -> aiosqlite.Connection:
+    """Open a new pooled read-only database connection"""
+    uri = f"{Path(DB_PATH).resolve().as_uri()}?mode=ro"
+    db = await aiosqlite.connect(uri, uri=True, cached_statements=DB_STATEMENT_CACHE_SIZE)
+    await configure_connection(db)
+    db.row_factory = aiosqlite.Row
+    return db
+
+
+def get_pool() -> SQLiteConnectionPool:
+    """Get the shared connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        _pool = SQLiteConnectionPool(connection_factory=_connect, pool_size=DB_POOL_SIZE)
+    return _pool
+
+
+def get_read_pool() -> SQLiteConnectionPool:
+    """Get the shared read-only connection pool, creating it on first use"""
+    global _read_pool
+    if _read_pool is None:
+        _read_pool = SQLiteConnectionPool(
+            connection_factory=_connect_readonly, pool_size=DB_READ_POOL_SIZE
+        )
+    return _read_pool
+
+
+async def close_pool():
+    """Close all pooled connections"""
+    global _pool, _read_pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+    if _read_pool is not None:
+        await _read_pool.close()
+        _read_pool = None
+
+
 async def get_db():
-    """Get database connection"""
-    async with aiosqlite.connect(DB_PATH) as db:
+    """Get database connection from the pool"""
+    async with get_pool().connection() as db:
         db.row_factory = aiosqlite.Row
         yield db
 
+
+async def get_read_db():
+    """Get a read-only database connection, for endpoints that never write"""
+    async with get_read_pool().connection() as db:
+        yield db
+
+
+# Full schema, applied by init_db as a single transaction
+SCHEMA_SQL = """
+BEGIN;
+
+-- Create folder_roots table
+CREATE TABLE IF NOT EXISTS folder_roots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    recursive BOOLEAN DEFAULT 1,
+    include_patterns TEXT,
+    exclude_patterns TEXT,
+    follow_symlinks BOOLEAN DEFAULT 0,
+    max_file_size INTEGER DEFAULT 10485760,
+    enable_content_indexing BOOLEAN DEFAULT 0,
+    enable_watch_mode BOOLEAN DEFAULT 0,
+    last_scan_time TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create folders table
+CREATE TABLE IF NOT EXISTS folders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    root_id INTEGER NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    parent_id INTEGER,
+    note TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (root_id) REFERENCES folder_roots(id) ON DELETE CASCADE,
+    FOREIGN KEY (parent_id) REFERENCES folders(id) ON DELETE CASCADE
+);
+
+-- Create scripts table
+CREATE TABLE IF NOT EXISTS scripts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    root_id INTEGER NOT NULL,
+    folder_id INTEGER,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    extension TEXT,
+    language TEXT,
+    size INTEGER,
+    mtime TIMESTAMP,
+    hash TEXT,
+    line_count INTEGER,
+    missing_flag BOOLEAN DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (root_id) REFERENCES folder_roots(id) ON DELETE CASCADE,
+    FOREIGN KEY (folder_id) REFERENCES folders(id) ON DELETE SET NULL
+);
+
+-- Create script_notes table
+CREATE TABLE IF NOT EXISTS script_notes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    script_id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    is_markdown BOOLEAN DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE
+);
+
+-- Create tags table
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    group_name TEXT,
+    color TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create script_tags table
+CREATE TABLE IF NOT EXISTS script_tags (
+    script_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (script_id, tag_id),
+    FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+);
+
+-- Create script_fields table for custom metadata
+CREATE TABLE IF NOT EXISTS script_fields (
+    script_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (script_id, key),
+    FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE
+);
+
+-- Create script_status table
+CREATE TABLE IF NOT EXISTS script_status (
+    script_id INTEGER PRIMARY KEY,
+    status TEXT DEFAULT 'active',
+    classification TEXT,
+    owner TEXT,
+    environment TEXT,
+    deprecated_date TIMESTAMP,
+    migration_note TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE
+);
+
+-- Create scan_events table
+CREATE TABLE IF NOT EXISTS scan_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    root_id INTEGER NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    ended_at TIMESTAMP,
+    status TEXT NOT NULL,
+    new_count INTEGER DEFAULT 0,
+    updated_count INTEGER DEFAULT 0,
+    deleted_count INTEGER DEFAULT 0,
+    error_count INTEGER DEFAULT 0,
+    error_message TEXT,
+    FOREIGN KEY (root_id) REFERENCES folder_roots(id) ON DELETE CASCADE
+);
+
+-- Create change_log table
+CREATE TABLE IF NOT EXISTS change_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    script_id INTEGER NOT NULL,
+    event_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    change_type TEXT NOT NULL,
+    old_value TEXT,
+    new_value TEXT,
+    actor TEXT,
+    FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE
+);
+
+-- Create attachments table
+CREATE TABLE IF NOT EXISTS attachments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    script_id INTEGER,
+    note_id INTEGER,
+    filename TEXT NOT NULL,
+    original_filename TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    mime_type TEXT,
+    hash TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE,
+    FOREIGN KEY (note_id) REFERENCES script_notes(id) ON DELETE CASCADE
+);
+
+-- Create users table
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL UNIQUE,
+    full_name TEXT,
+    hashed_password TEXT NOT NULL,
+    is_active BOOLEAN DEFAULT 1,
+    is_superuser BOOLEAN DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create roles table
+CREATE TABLE IF NOT EXISTS roles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    permissions TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create user_roles junction table
+CREATE TABLE IF NOT EXISTS user_roles (
+    user_id INTEGER NOT NULL,
+    role_id INTEGER NOT NULL,
+    assigned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, role_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (role_id) REFERENCES roles(id) ON DELETE CASCADE
+);
+
+-- Create saved_searches table
+CREATE TABLE IF NOT EXISTS saved_searches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    query_params TEXT NOT NULL,
+    is_pinned BOOLEAN DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create app_settings table for wizard/configuration state
+CREATE TABLE IF NOT EXISTS app_settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create monitors table for heartbeat/fail-safe monitoring
+CREATE TABLE IF NOT EXISTS monitors (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    expected_interval_seconds INTEGER NOT NULL DEFAULT 300,
+    grace_period_seconds INTEGER NOT NULL DEFAULT 60,
+    ping_key TEXT NOT NULL UNIQUE,
+    last_ping_at TIMESTAMP,
+    status TEXT NOT NULL DEFAULT 'new',
+    notify_channel_ids TEXT DEFAULT '[]',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create monitor_pings table for ping history
+CREATE TABLE IF NOT EXISTS monitor_pings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    monitor_id INTEGER NOT NULL,
+    pinged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    source_ip TEXT,
+    FOREIGN KEY (monitor_id) REFERENCES monitors(id) ON DELETE CASCADE
+);
+
+-- Create schedule_jobs table for cron/scheduled tasks
+CREATE TABLE IF NOT EXISTS schedule_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    script_id INTEGER,
+    command TEXT,
+    cron_expression TEXT NOT NULL,
+    timezone TEXT NOT NULL DEFAULT 'UTC',
+    enabled BOOLEAN NOT NULL DEFAULT 1,
+    max_retries INTEGER NOT NULL DEFAULT 0,
+    retry_delay_seconds INTEGER NOT NULL DEFAULT 60,
+    prevent_overlap BOOLEAN NOT NULL DEFAULT 1,
+    timeout_seconds INTEGER,
+    notify_channel_ids TEXT DEFAULT '[]',
+    last_run_at TIMESTAMP,
+    next_run_at TIMESTAMP,
+    last_status TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE SET NULL
+);
+
+-- Create job_executions table for execution history and log capture
+CREATE TABLE IF NOT EXISTS job_executions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    ended_at TIMESTAMP,
+    status TEXT NOT NULL DEFAULT 'running',
+    exit_code INTEGER,
+    stdout TEXT,
+    stderr TEXT,
+    duration_seconds REAL,
+    retry_attempt INTEGER NOT NULL DEFAULT 0,
+    triggered_by TEXT NOT NULL DEFAULT 'scheduler',
+    FOREIGN KEY (job_id) REFERENCES schedule_jobs(id) ON DELETE CASCADE
+);
+
+-- Create notification_channels table
+CREATE TABLE IF NOT EXISTS notification_channels (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    type TEXT NOT NULL,
+    config TEXT NOT NULL DEFAULT '{}',
+    enabled BOOLEAN NOT NULL DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create incidents table for grouped failure alerts
+CREATE TABLE IF NOT EXISTS incidents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    source_type TEXT NOT NULL,
+    source_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'open',
+    severity TEXT NOT NULL DEFAULT 'warning',
+    description TEXT,
+    acknowledged_at TIMESTAMP,
+    acknowledged_by TEXT,
+    resolved_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create FTS5 virtual table for full-text search
+CREATE VIRTUAL TABLE IF NOT EXISTS scripts_fts USING fts5(
+    script_id UNINDEXED,
+    name,
+    path,
+    content,
+    notes,
+    tokenize='porter unicode61'
+);
+
+-- Create indexes for performance
+CREATE INDEX IF NOT EXISTS idx_scripts_name ON scripts(name);
+CREATE INDEX IF NOT EXISTS idx_scripts_extension ON scripts(extension);
+CREATE INDEX IF NOT EXISTS idx_scripts_language_name ON scripts(language, missing_flag, name);
+CREATE INDEX IF NOT EXISTS idx_scripts_hash ON scripts(hash);
+CREATE INDEX IF NOT EXISTS idx_scripts_mtime ON scripts(mtime);
+CREATE INDEX IF NOT EXISTS idx_scripts_size ON scripts(size);
+CREATE INDEX IF NOT EXISTS idx_scripts_root_missing_name ON scripts(root_id, missing_flag, name);
+-- Covers the duplicate report: hashes of present scripts, with their paths
+CREATE INDEX IF NOT EXISTS idx_scripts_duplicates ON scripts(hash, missing_flag, path)
+    WHERE hash IS NOT NULL AND hash != '' AND missing_flag = 0;
+CREATE INDEX IF NOT EXISTS idx_script_tags_tag_script ON script_tags(tag_id, script_id);
+-- Superseded by the wider indexes above, or by script_tags' primary key
+DROP INDEX IF EXISTS idx_scripts_language;
+DROP INDEX IF EXISTS idx_scripts_root_missing;
+DROP INDEX IF EXISTS idx_script_tags_script;
+DROP INDEX IF EXISTS idx_script_tags_tag;
+CREATE INDEX IF NOT EXISTS idx_change_log_script ON change_log(script_id);
+CREATE INDEX IF NOT EXISTS idx_change_log_time ON change_log(event_time);
+CREATE INDEX IF NOT EXISTS idx_monitor_pings_monitor ON monitor_pings(monitor_id);
+CREATE INDEX IF NOT EXISTS idx_job_executions_job ON job_executions(job_id);
+CREATE INDEX IF NOT EXISTS idx_job_executions_started ON job_executions(started_at);
+CREATE INDEX IF NOT EXISTS idx_incidents_source ON incidents(source_type, source_id);
+CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents(status);
+CREATE INDEX IF NOT EXISTS idx_attachments_script ON attachments(script_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_attachments_note ON attachments(note_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_attachments_mime ON attachments(mime_type);
+
+COMMIT;
+"""
+
+# Columns added after their table was first released, as (table, column, type).
+# CREATE TABLE IF NOT EXISTS leaves existing tables alone, so init_db adds
+# any of these that are missing.
+SCHEMA_MIGRATIONS = (
+    ("attachments", "hash", "TEXT"),
+)
+
+
+async def _apply_migrations(db: aiosqlite.Connection):
+    """Add columns missing from tables created by an older schema"""
+    for table, column, column_type in SCHEMA_MIGRATIONS:
+        async with db.execute(f"PRAGMA table_info({table})") as cursor:
+            existing = {row[1] for row in await cursor.fetchall()}
+        if column not in existing:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    await db.commit()
+
+
 async def init_db():
     """Initialize database with schema"""
     async with aiosqlite.connect(DB_PATH) as db:
-        # Enable foreign keys
-        await db.execute("PRAGMA foreign_keys = ON")
-        
-        # Create folder_roots table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS folder_roots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                path TEXT NOT NULL UNIQUE,
-                name TEXT NOT NULL,
-                recursive BOOLEAN DEFAULT 1,
-                include_patterns TEXT,
-                exclude_patterns TEXT,
-                follow_symlinks BOOLEAN DEFAULT 0,
-                max_file_size INTEGER DEFAULT 10485760,
-                enable_content_indexing BOOLEAN DEFAULT 0,
-                enable_watch_mode BOOLEAN DEFAULT 0,
-                last_scan_time TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create folders table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS folders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                root_id INTEGER NOT NULL,
-                path TEXT NOT NULL UNIQUE,
-                parent_id INTEGER,
-                note TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (root_id) REFERENCES folder_roots(id) ON DELETE CASCADE,
-                FOREIGN KEY (parent_id) REFERENCES folders(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Create scripts table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS scripts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                root_id INTEGER NOT NULL,
-                folder_id INTEGER,
-                path TEXT NOT NULL UNIQUE,
-                name TEXT NOT NULL,
-                extension TEXT,
-                language TEXT,
-                size INTEGER,
-                mtime TIMESTAMP,
-                hash TEXT,
-                line_count INTEGER,
-                missing_flag BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (root_id) REFERENCES folder_roots(id) ON DELETE CASCADE,
-                FOREIGN KEY (folder_id) REFERENCES folders(id) ON DELETE SET NULL
-            )
-        """)
-        
-        # Create script_notes table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS script_notes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                script_id INTEGER NOT NULL,
-                content TEXT NOT NULL,
-                is_markdown BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Create tags table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS tags (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                group_name TEXT,
-                color TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create script_tags table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS script_tags (
-                script_id INTEGER NOT NULL,
-                tag_id INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (script_id, tag_id),
-                FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE,
-                FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Create script_fields table for custom metadata
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS script_fields (
-                script_id INTEGER NOT NULL,
-                key TEXT NOT NULL,
-                value TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (script_id, key),
-                FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Create script_status table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS script_status (
-                script_id INTEGER PRIMARY KEY,
-                status TEXT DEFAULT 'active',
-                classification TEXT,
-                owner TEXT,
-                environment TEXT,
-                deprecated_date TIMESTAMP,
-                migration_note TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Create scan_events table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS scan_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                root_id INTEGER NOT NULL,
-                started_at TIMESTAMP NOT NULL,
-                ended_at TIMESTAMP,
-                status TEXT NOT NULL,
-                new_count INTEGER DEFAULT 0,
-                updated_count INTEGER DEFAULT 0,
-                deleted_count INTEGER DEFAULT 0,
-                error_count INTEGER DEFAULT 0,
-                error_message TEXT,
-                FOREIGN KEY (root_id) REFERENCES folder_roots(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Create change_log table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS change_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                script_id INTEGER NOT NULL,
-                event_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                change_type TEXT NOT NULL,
-                old_value TEXT,
-                new_value TEXT,
-                actor TEXT,
-                FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Create attachments table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS attachments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                script_id INTEGER,
-                note_id INTEGER,
-                filename TEXT NOT NULL,
-                original_filename TEXT NOT NULL,
-                file_path TEXT NOT NULL,
-                file_size INTEGER NOT NULL,
-                mime_type TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE CASCADE,
-                FOREIGN KEY (note_id) REFERENCES script_notes(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Create users table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                email TEXT NOT NULL UNIQUE,
-                full_name TEXT,
-                hashed_password TEXT NOT NULL,
-                is_active BOOLEAN DEFAULT 1,
-                is_superuser BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create roles table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS roles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                description TEXT,
-                permissions TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create user_roles junction table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS user_roles (
-                user_id INTEGER NOT NULL,
-                role_id INTEGER NOT NULL,
-                assigned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (user_id, role_id),
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                FOREIGN KEY (role_id) REFERENCES roles(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Create saved_searches table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS saved_searches (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                description TEXT,
-                query_params TEXT NOT NULL,
-                is_pinned BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create app_settings table for wizard/configuration state
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS app_settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create monitors table for heartbeat/fail-safe monitoring
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS monitors (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                description TEXT,
-                expected_interval_seconds INTEGER NOT NULL DEFAULT 300,
-                grace_period_seconds INTEGER NOT NULL DEFAULT 60,
-                ping_key TEXT NOT NULL UNIQUE,
-                last_ping_at TIMESTAMP,
-                status TEXT NOT NULL DEFAULT 'new',
-                notify_channel_ids TEXT DEFAULT '[]',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Create monitor_pings table for ping history
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS monitor_pings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                monitor_id INTEGER NOT NULL,
-                pinged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                source_ip TEXT,
-                FOREIGN KEY (monitor_id) REFERENCES monitors(id) ON DELETE CASCADE
-            )
-        """)
-
-        # Create schedule_jobs table for cron/scheduled tasks
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS schedule_jobs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                description TEXT,
-                script_id INTEGER,
-                command TEXT,
-                cron_expression TEXT NOT NULL,
-                timezone TEXT NOT NULL DEFAULT 'UTC',
-                enabled BOOLEAN NOT NULL DEFAULT 1,
-                max_retries INTEGER NOT NULL DEFAULT 0,
-                retry_delay_seconds INTEGER NOT NULL DEFAULT 60,
-                prevent_overlap BOOLEAN NOT NULL DEFAULT 1,
-                timeout_seconds INTEGER,
-                notify_channel_ids TEXT DEFAULT '[]',
-                last_run_at TIMESTAMP,
-                next_run_at TIMESTAMP,
-                last_status TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (script_id) REFERENCES scripts(id) ON DELETE SET NULL
-            )
-        """)
-
-        # Create job_executions table for execution history and log capture
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS job_executions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                job_id INTEGER NOT NULL,
-                started_at TIMESTAMP NOT NULL,
-                ended_at TIMESTAMP,
-                status TEXT NOT NULL DEFAULT 'running',
-                exit_code INTEGER,
-                stdout TEXT,
-                stderr TEXT,
-                duration_seconds REAL,
-                retry_attempt INTEGER NOT NULL DEFAULT 0,
-                triggered_by TEXT NOT NULL DEFAULT 'scheduler',
-                FOREIGN KEY (job_id) REFERENCES schedule_jobs(id) ON DELETE CASCADE
-            )
-        """)
-
-        # Create notification_channels table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS notification_channels (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                type TEXT NOT NULL,
-                config TEXT NOT NULL DEFAULT '{}',
-                enabled BOOLEAN NOT NULL DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Create incidents table for grouped failure alerts
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS incidents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                source_type TEXT NOT NULL,
-                source_id INTEGER,
-                status TEXT NOT NULL DEFAULT 'open',
-                severity TEXT NOT NULL DEFAULT 'warning',
-                description TEXT,
-                acknowledged_at TIMESTAMP,
-                acknowledged_by TEXT,
-                resolved_at TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Create FTS5 virtual table for full-text search
-        await db.execute("""
-            CREATE VIRTUAL TABLE IF NOT EXISTS scripts_fts USING fts5(
-                script_id UNINDEXED,
-                name,
-                path,
-                content,
-                notes,
-                tokenize='porter unicode61'
-            )
-        """)
-        
-        # Create indexes for performance
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_scripts_name ON scripts(name)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_scripts_extension ON scripts(extension)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_scripts_language ON scripts(language)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_scripts_hash ON scripts(hash)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_scripts_mtime ON scripts(mtime)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_script_tags_script ON script_tags(script_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_script_tags_tag ON script_tags(tag_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_change_log_script ON change_log(script_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_change_log_time ON change_log(event_time)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_monitor_pings_monitor ON monitor_pings(monitor_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_job_executions_job ON job_executions(job_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_job_executions_started ON job_executions(started_at)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_incidents_source ON incidents(source_type, source_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents(status)")
-        
-        await db.commit()
+        # WAL lets readers proceed alongside the single writer
+        await db.execute("PRAGMA journal_mode = WAL")
+        await configure_connection(db)
+        await db.executescript(SCHEMA_SQL)
+        await _apply_migrations(db)
         print("Database initialized successfully")
+    bump_catalog_version()
+
+
+def _prefetch_file(path: str):
+    """Ask the kernel to read a file into the OS page cache"""
+    if not hasattr(os, "posix_fadvise") or not os.path.exists(path):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+async def warm_db():
+    """Best-effort warm-up of the OS and SQLite page caches"""
+    try:
+        await asyncio.to_thread(_prefetch_file, DB_PATH)
+        async with get_pool().connection() as db:
+            await db.execute("PRAGMA optimize")
+            async with db.execute("SELECT COUNT(*) FROM scripts_fts") as cursor:
+                await cursor.fetchone()
+    except Exception as e:
+        print(f"Database warm-up skipped: {e}")
@@ -135,6 +135,7 @@ class PaginatedResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None
 
 class FolderResponse(BaseModel):
     id: int
@@ -180,6 +181,17 @@ class FTSSearchRequest(BaseModel):
     page: int = 1
     page_size: int = 50
 
+class FTSSearchResult(ScriptListResponse):
+    rank: float
+    snippet: Optional[str] = None
+
+class FTSSearchResponse(BaseModel):
+    items: List[FTSSearchResult]
+    total: int
+    page: int
+    page_size: int
+    total_pages: int
+
 class AttachmentResponse(BaseModel):
     id: int
     script_id: Optional[int]
@@ -189,6 +201,7 @@ class AttachmentResponse(BaseModel):
     file_path: str
     file_size: int
     mime_type: Optional[str]
+    hash: Optional[str] = None
     created_at: datetime
 
 
@@ -2,11 +2,14 @@
 Attachments API endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from typing import List, Optional
 import aiosqlite
+import aiofiles
+import asyncio
+import hashlib
 import os
-import uuid
+import secrets
 from pathlib import Path
 import mimetypes
 
@@ -22,6 +25,21 @@ Path(ATTACHMENTS_DIR).mkdir(parents=True, exist_ok=True)
 # Max file size (10MB)
 MAX_ATTACHMENT_SIZE = 10 * 1024 * 1024
 
+# Uploads are streamed to disk in chunks of this size (1MB)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Attachment columns as returned to clients. created_at is rendered as ISO 8601
+# in SQL so rows from our own schema can be serialized directly, skipping a
+# Pydantic validation round-trip that would only re-check them.
+ATTACHMENT_COLUMNS = """
+    id, script_id, note_id, filename, original_filename, file_path, file_size,
+    mime_type, hash, strftime('%Y-%m-%dT%H:%M:%S', created_at) AS created_at
+"""
+
+# MIME types by extension, loaded once at import instead of per upload
+mimetypes.init()
+MIME_TYPES = dict(mimetypes.types_map)
+
 
 @router.post("/upload", response_model=AttachmentResponse)
 async def upload_attachment(
@@ -37,58 +55,70 @@ async def upload_attachment(
     if not script_id and not note_id:
         raise HTTPException(status_code=400, detail="Must specify either script_id or note_id")
     
-    # Verify script or note exists
-    if script_id:
-        async with db.execute("SELECT id FROM scripts WHERE id = ?", (script_id,)) as cursor:
-            if not await cursor.fetchone():
-                raise HTTPException(status_code=404, detail="Script not found")
-    
-    if note_id:
-        async with db.execute("SELECT id FROM script_notes WHERE id = ?", (note_id,)) as cursor:
-            if not await cursor.fetchone():
-                raise HTTPException(status_code=404, detail="Note not found")
-    
-    # Read file content
-    content = await file.read()
-    file_size = len(content)
-    
-    # Check file size
-    if file_size > MAX_ATTACHMENT_SIZE:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size is {MAX_ATTACHMENT_SIZE / (1024*1024)}MB"
-        )
+    # Verify script and/or note exist in a single round-trip
+    async with db.execute(
+        """
+        SELECT EXISTS(SELECT 1 FROM scripts WHERE id = ?),
+               EXISTS(SELECT 1 FROM script_notes WHERE id = ?)
+        """,
+        (script_id, note_id)
+    ) as cursor:
+        script_exists, note_exists = await cursor.fetchone()
+    
+    if script_id and not script_exists:
+        raise HTTPException(status_code=404, detail="Script not found")
+    
+    if note_id and not note_exists:
+        raise HTTPException(status_code=404, detail="Note not found")
     
     # Generate unique filename
     file_extension = Path(file.filename).suffix
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
+    unique_filename = secrets.token_hex(16) + file_extension
     file_path = os.path.join(ATTACHMENTS_DIR, unique_filename)
     
-    # Save file
-    with open(file_path, 'wb') as f:
-        f.write(content)
+    # Stream file to disk, stopping as soon as it exceeds the size limit.
+    # The content hash (SHA-256, as used for scripts) is computed in the same pass.
+    file_size = 0
+    file_hash = hashlib.sha256()
+    try:
+        async with aiofiles.open(file_path, 'wb') as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > MAX_ATTACHMENT_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size is {MAX_ATTACHMENT_SIZE / (1024*1024)}MB"
+                    )
+                file_hash.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        # Don't leave a partial file behind with no attachment row pointing at it;
+        # this also covers cancellation when the client disconnects
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
     
     # Detect MIME type
-    mime_type, _ = mimetypes.guess_type(file.filename)
+    # Fall back to guess_type for what a suffix lookup misses, such as .tbz2
+    mime_type = MIME_TYPES.get(file_extension.lower()) or mimetypes.guess_type(file.filename)[0]
     
-    # Save to database
-    cursor = await db.execute(
-        """
+    # Save to database and return the stored attachment details
+    async with db.execute(
+        f"""
         INSERT INTO attachments (script_id, note_id, filename, original_filename, 
-                                file_path, file_size, mime_type)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+                                file_path, file_size, mime_type, hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        RETURNING {ATTACHMENT_COLUMNS}
         """,
-        (script_id, note_id, unique_filename, file.filename, file_path, file_size, mime_type)
-    )
-    await db.commit()
-    
-    # Return attachment details
-    async with db.execute(
-        "SELECT * FROM attachments WHERE id = ?",
-        (cursor.lastrowid,)
+        (
+            script_id, note_id, unique_filename, file.filename, file_path,
+            file_size, mime_type, file_hash.hexdigest()
+        )
     ) as cursor:
         row = await cursor.fetchone()
-        return dict(row)
+    await db.commit()
+    
+    return ORJSONResponse(dict(row))
 
 
 @router.get("/script/{script_id}", response_model=List[AttachmentResponse])
@@ -102,11 +132,12 @@ async def list_script_attachments(
             raise HTTPException(status_code=404, detail="Script not found")
     
     async with db.execute(
-        "SELECT * FROM attachments WHERE script_id = ? ORDER BY created_at DESC",
+        f"SELECT {ATTACHMENT_COLUMNS} FROM attachments WHERE script_id = ? ORDER BY attachments.created_at DESC",
         (script_id,)
     ) as cursor:
+        columns = [c[0] for c in cursor.description]
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+    return ORJSONResponse([dict(zip(columns, row)) for row in rows])
 
 
 @router.get("/note/{note_id}", response_model=List[AttachmentResponse])
@@ -120,11 +151,12 @@ async def list_note_attachments(
             raise HTTPException(status_code=404, detail="Note not found")
     
     async with db.execute(
-        "SELECT * FROM attachments WHERE note_id = ? ORDER BY created_at DESC",
+        f"SELECT {ATTACHMENT_COLUMNS} FROM attachments WHERE note_id = ? ORDER BY attachments.created_at DESC",
         (note_id,)
     ) as cursor:
+        columns = [c[0] for c in cursor.description]
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+    return ORJSONResponse([dict(zip(columns, row)) for row in rows])
 
 
 @router.get("/{attachment_id}/download")
@@ -143,15 +175,18 @@ async def download_attachment(
         
         file_path, original_filename, mime_type = row
     
-    # Check if file exists
-    if not os.path.exists(file_path):
+    # Stat once here and hand the result to FileResponse so it is not repeated
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Attachment file not found on disk")
     
     # Return file
     return FileResponse(
         path=file_path,
         filename=original_filename,
-        media_type=mime_type or 'application/octet-stream'
+        media_type=mime_type or 'application/octet-stream',
+        stat_result=stat_result
     )
 
 
@@ -162,13 +197,13 @@ async def get_attachment(
 ):
     """Get attachment metadata"""
     async with db.execute(
-        "SELECT * FROM attachments WHERE id = ?",
+        f"SELECT {ATTACHMENT_COLUMNS} FROM attachments WHERE id = ?",
         (attachment_id,)
     ) as cursor:
         row = await cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Attachment not found")
-        return dict(row)
+        return ORJSONResponse(dict(row))
 
 
 @router.delete("/{attachment_id}")
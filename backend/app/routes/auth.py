@@ -3,9 +3,11 @@ Authentication and User Management API endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 import aiosqlite
-import json
+import asyncio
+import orjson
+import time
 
 from app.db.database import get_db
 from app.services.auth import (
@@ -19,35 +21,37 @@ router = APIRouter()
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Resolved users (with merged role permissions) are cached briefly so that
+# authenticated requests don't query the users/roles tables every time
+USER_CACHE_TTL_SECONDS = 30
+USER_CACHE_MAX_SIZE = 1024
+_user_cache: Dict[str, Tuple[float, dict]] = {}
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: aiosqlite.Connection = Depends(get_db)
-) -> dict:
-    """Get current authenticated user"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    # Decode token
-    payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
-    
-    username: str = payload.get("sub")
-    if username is None:
-        raise credentials_exception
+
+def clear_user_cache(user_id: Optional[int] = None):
+    """Drop all cached users, or only the entry for the given user id"""
+    if user_id is None:
+        _user_cache.clear()
+        return
+    for username, (_, user) in list(_user_cache.items()):
+        if user['id'] == user_id:
+            del _user_cache[username]
+
+
+async def _load_user(db: aiosqlite.Connection, username: str) -> Optional[dict]:
+    """Load a user with their permissions, serving from the cache while fresh"""
+    now = time.monotonic()
+    cached = _user_cache.get(username)
+    if cached and cached[0] > now:
+        return dict(cached[1])
     
-    # Get user from database
     async with db.execute(
         "SELECT id, username, email, full_name, is_active, is_superuser FROM users WHERE username = ?",
         (username,)
     ) as cursor:
         user = await cursor.fetchone()
         if not user:
-            raise credentials_exception
+            return None
         
         user_dict = dict(user)
     
@@ -63,12 +67,42 @@ async def get_current_user(
     ) as cursor:
         roles = await cursor.fetchall()
         
-        permissions = []
-        for role in roles:
-            role_perms = json.loads(role[0])
-            permissions.extend(role_perms)
+        permissions = set()
+        for (role_perms,) in roles:
+            permissions.update(orjson.loads(role_perms))
         
-        user_dict['permissions'] = list(set(permissions))
+        user_dict['permissions'] = list(permissions)
+    
+    if len(_user_cache) >= USER_CACHE_MAX_SIZE:
+        _user_cache.pop(next(iter(_user_cache)))
+    _user_cache[username] = (now + USER_CACHE_TTL_SECONDS, user_dict)
+    return dict(user_dict)
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: aiosqlite.Connection = Depends(get_db)
+) -> dict:
+    """Get current authenticated user"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    # Decode token
+    payload = decode_access_token(token)
+    if payload is None:
+        raise credentials_exception
+    
+    username: str = payload.get("sub")
+    if username is None:
+        raise credentials_exception
+    
+    # Get user from database (or the short-lived cache)
+    user_dict = await _load_user(db, username)
+    if user_dict is None:
+        raise credentials_exception
     
     if not user_dict['is_active']:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -89,7 +123,8 @@ async def login(
     ) as cursor:
         user = await cursor.fetchone()
     
-    if not user or not verify_password(form_data.password, user[2]):
+    # Password hashing is CPU-bound; keep it off the event loop
+    if not user or not await asyncio.to_thread(verify_password, form_data.password, user[2]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -136,41 +171,36 @@ async def register_user(
     if not is_valid:
         raise HTTPException(status_code=400, detail=error_msg)
     
-    # Check if username exists
+    # Check if username or email exists
     async with db.execute(
-        "SELECT id FROM users WHERE username = ?",
-        (username,)
+        "SELECT EXISTS(SELECT 1 FROM users WHERE username = ?), EXISTS(SELECT 1 FROM users WHERE email = ?)",
+        (username, email)
     ) as cursor:
-        if await cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Username already exists")
+        username_taken, email_taken = await cursor.fetchone()
     
-    # Check if email exists
-    async with db.execute(
-        "SELECT id FROM users WHERE email = ?",
-        (email,)
-    ) as cursor:
-        if await cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Email already exists")
+    if username_taken:
+        raise HTTPException(status_code=400, detail="Username already exists")
+    
+    if email_taken:
+        raise HTTPException(status_code=400, detail="Email already exists")
     
     # Create user
-    hashed_password = get_password_hash(password)
-    cursor = await db.execute(
+    hashed_password = await asyncio.to_thread(get_password_hash, password)
+    async with db.execute(
         """
         INSERT INTO users (username, email, full_name, hashed_password, is_active, is_superuser)
         VALUES (?, ?, ?, ?, ?, ?)
+        RETURNING id
         """,
         (username, email, full_name, hashed_password, True, False)
-    )
-    user_id = cursor.lastrowid
+    ) as cursor:
+        user_id = (await cursor.fetchone())[0]
     
     # Assign default viewer role
-    async with db.execute("SELECT id FROM roles WHERE name = ?", ("viewer",)) as cursor:
-        role_row = await cursor.fetchone()
-        if role_row:
-            await db.execute(
-                "INSERT INTO user_roles (user_id, role_id) VALUES (?, ?)",
-                (user_id, role_row[0])
-            )
+    await db.execute(
+        "INSERT INTO user_roles (user_id, role_id) SELECT ?, id FROM roles WHERE name = ?",
+        (user_id, "viewer")
+    )
     
     await db.commit()
     
@@ -200,16 +230,17 @@ async def change_password(
         (current_user['id'],)
     ) as cursor:
         row = await cursor.fetchone()
-        if not row or not verify_password(old_password, row[0]):
+        if not row or not await asyncio.to_thread(verify_password, old_password, row[0]):
             raise HTTPException(status_code=400, detail="Incorrect password")
     
     # Update password
-    new_hashed = get_password_hash(new_password)
+    new_hashed = await asyncio.to_thread(get_password_hash, new_password)
     await db.execute(
         "UPDATE users SET hashed_password = ? WHERE id = ?",
         (new_hashed, current_user['id'])
     )
     await db.commit()
+    clear_user_cache(current_user['id'])
     
     return {"message": "Password changed successfully"}
 
@@ -309,6 +340,7 @@ async def update_user(
             )
 
     await db.commit()
+    clear_user_cache(user_id)
     return await get_user(user_id, current_user, db)
 
 
@@ -328,6 +360,7 @@ async def delete_user(
             raise HTTPException(status_code=404, detail="User not found")
     await db.execute("DELETE FROM users WHERE id = ?", (user_id,))
     await db.commit()
+    clear_user_cache(user_id)
 
 
 @router.get("/roles")
@@ -1,38 +1,48 @@
 """
 Folder roots API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response
+from fastapi.responses import ORJSONResponse
+from typing import Dict, List, Optional
 from datetime import datetime
+import asyncio
+from contextlib import aclosing, asynccontextmanager
 import aiosqlite
 
-from app.db.database import get_db, DB_PATH
-from app.models.schemas import FolderRootCreate, FolderRootResponse, ScanRequest, ScanResponse
-from app.services.scanner import scan_directory
+from app.db.database import (
+    get_db, configure_connection, sql_timestamp, bump_catalog_version,
+    DB_PATH, DB_STATEMENT_CACHE_SIZE
+)
+from app.models.schemas import FolderRootCreate, FolderRootResponse, ScanRequest
+from app.services.scanner import iter_script_batches, hash_scripts, SCAN_BATCH_SIZE
 
 router = APIRouter()
 
 
-def _normalize_mtime(value):
-    """Normalize SQLite/Python datetime values for consistent comparisons."""
-    if value is None:
-        return None
-    if isinstance(value, datetime):
-        return value.replace(microsecond=0).isoformat(sep=' ')
-    if isinstance(value, str):
-        try:
-            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
-            return parsed.replace(microsecond=0).isoformat(sep=' ')
-        except ValueError:
-            return value
-    return str(value)
+# Columns shaped like FolderRootResponse: timestamps in ISO form, flags as 0/1
+FOLDER_ROOT_COLUMNS = """
+    id, path, name, recursive, include_patterns, exclude_patterns,
+    follow_symlinks, max_file_size, enable_content_indexing, enable_watch_mode,
+    replace(last_scan_time, ' ', 'T') AS last_scan_time,
+    replace(created_at, ' ', 'T') AS created_at,
+    replace(updated_at, ' ', 'T') AS updated_at
+"""
+FOLDER_ROOT_FLAGS = ('recursive', 'follow_symlinks', 'enable_content_indexing', 'enable_watch_mode')
 
 @router.get("/", response_model=List[FolderRootResponse])
 async def list_folder_roots(db: aiosqlite.Connection = Depends(get_db)):
     """List all folder roots"""
-    async with db.execute("SELECT * FROM folder_roots ORDER BY name") as cursor:
+    async with db.execute(
+        f"SELECT {FOLDER_ROOT_COLUMNS} FROM folder_roots ORDER BY name"
+    ) as cursor:
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+    roots = []
+    for row in rows:
+        root = dict(row)
+        for flag in FOLDER_ROOT_FLAGS:
+            root[flag] = bool(root[flag])
+        roots.append(root)
+    return ORJSONResponse(roots)
 
 @router.post("/", response_model=FolderRootResponse)
 async def create_folder_root(
@@ -40,37 +50,33 @@ async def create_folder_root(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Create a new folder root"""
-    try:
-        cursor = await db.execute(
-            """
-            INSERT INTO folder_roots (path, name, recursive, include_patterns, 
-                                     exclude_patterns, follow_symlinks, max_file_size, 
-                                     enable_content_indexing, enable_watch_mode)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                folder_root.path,
-                folder_root.name,
-                folder_root.recursive,
-                folder_root.include_patterns,
-                folder_root.exclude_patterns,
-                folder_root.follow_symlinks,
-                folder_root.max_file_size,
-                folder_root.enable_content_indexing,
-                folder_root.enable_watch_mode
-            )
+    async with db.execute(
+        """
+        INSERT INTO folder_roots (path, name, recursive, include_patterns, 
+                                 exclude_patterns, follow_symlinks, max_file_size, 
+                                 enable_content_indexing, enable_watch_mode)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO NOTHING
+        RETURNING *
+        """,
+        (
+            folder_root.path,
+            folder_root.name,
+            folder_root.recursive,
+            folder_root.include_patterns,
+            folder_root.exclude_patterns,
+            folder_root.follow_symlinks,
+            folder_root.max_file_size,
+            folder_root.enable_content_indexing,
+            folder_root.enable_watch_mode
         )
-        await db.commit()
-        
-        # Fetch the created folder root
-        async with db.execute(
-            "SELECT * FROM folder_roots WHERE id = ?",
-            (cursor.lastrowid,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            return dict(row)
-    except aiosqlite.IntegrityError:
+    ) as cursor:
+        row = await cursor.fetchone()
+    if not row:
         raise HTTPException(status_code=400, detail="Folder root with this path already exists")
+    
+    await db.commit()
+    return dict(row)
 
 @router.get("/{root_id}", response_model=FolderRootResponse)
 async def get_folder_root(root_id: int, db: aiosqlite.Connection = Depends(get_db)):
@@ -81,137 +87,248 @@ async def get_folder_root(root_id: int, db: aiosqlite.Connection = Depends(get_d
             raise HTTPException(status_code=404, detail="Folder root not found")
         return dict(row)
 
-@router.delete("/{root_id}")
+@router.delete("/{root_id}", status_code=204, response_class=Response)
 async def delete_folder_root(root_id: int, db: aiosqlite.Connection = Depends(get_db)):
     """Delete a folder root and all its scripts"""
-    async with db.execute("SELECT * FROM folder_roots WHERE id = ?", (root_id,)) as cursor:
-        row = await cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Folder root not found")
-    
-    await db.execute("DELETE FROM folder_roots WHERE id = ?", (root_id,))
+    cursor = await db.execute("DELETE FROM folder_roots WHERE id = ?", (root_id,))
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Folder root not found")
     await db.commit()
-    return {"message": "Folder root deleted successfully"}
+    bump_catalog_version()
+    return Response(status_code=204)
 
-async def _perform_scan_background(root_id: int, root_data: dict, scan_id: int):
-    """Background task to perform the actual scanning"""
-    try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            # Scan directory
-            scripts = await scan_directory(
-                root_data['path'],
-                root_data['recursive'],
-                root_data['include_patterns'],
-                root_data['exclude_patterns'],
-                root_data['follow_symlinks'],
-                root_data['max_file_size']
-            )
+# Scans share one writer connection; the lock is held only for each short
+# write transaction, so walking and hashing of different roots can overlap
+_scan_writer: Optional[aiosqlite.Connection] = None
+_scan_writer_lock = asyncio.Lock()
+
+# Live counters for running scans, keyed by scan id; scan_events only
+# receives the totals once the scan transaction commits
+_scan_progress: Dict[int, dict] = {}
+
+# Scan statements are kept as constants so each one is prepared once and then
+# served from the connection's statement cache on every later scan
+# Insert new scripts, or refresh existing ones whose content or mtime changed.
+# mtimes are stored as canonical second-precision strings; the substr also
+# matches rows written before fractional seconds were dropped.
+UPSERT_SCRIPT_SQL = """
+    INSERT INTO scripts (root_id, path, name, extension, language,
+                       size, mtime, hash, line_count, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(path) DO UPDATE SET
+        name = excluded.name, extension = excluded.extension,
+        language = excluded.language, size = excluded.size,
+        mtime = excluded.mtime, hash = excluded.hash,
+        line_count = excluded.line_count, missing_flag = 0,
+        updated_at = excluded.updated_at
+    WHERE scripts.hash IS NOT excluded.hash
+       OR substr(scripts.mtime, 1, 19) IS NOT excluded.mtime
+"""
+
+# Concurrent scans share the writer's temp table, so staged paths are keyed by scan
+CREATE_SCANNED_PATHS_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS scanned_paths (
+        scan_id INTEGER, path TEXT, PRIMARY KEY (scan_id, path)
+    )
+"""
+CLEAR_SCANNED_PATHS_SQL = "DELETE FROM scanned_paths WHERE scan_id = ?"
+INSERT_SCANNED_PATH_SQL = "INSERT OR IGNORE INTO scanned_paths (scan_id, path) VALUES (?, ?)"
+
+PRELOAD_SCRIPTS_SQL = (
+    "SELECT path, size, mtime, hash, line_count FROM scripts WHERE path IN "
+    f"({','.join('?' * SCAN_BATCH_SIZE)})"
+)
+
+COUNT_EXISTING_SCRIPTS_SQL = (
+    "SELECT count(*) FROM scripts WHERE path IN "
+    f"({','.join('?' * SCAN_BATCH_SIZE)})"
+)
+
+MARK_PRESENT_SQL = """
+    UPDATE scripts SET missing_flag = 0
+    WHERE missing_flag = 1 AND path IN (SELECT path FROM scanned_paths WHERE scan_id = ?)
+"""
+
+MARK_MISSING_SQL = """
+    UPDATE scripts SET missing_flag = 1
+    WHERE root_id = ? AND missing_flag = 0
+      AND path NOT IN (SELECT path FROM scanned_paths WHERE scan_id = ?)
+"""
+
+COMPLETE_SCAN_SQL = """
+    UPDATE scan_events
+    SET ended_at = ?, status = 'completed',
+        new_count = ?, updated_count = ?, deleted_count = ?
+    WHERE id = ?
+"""
+
+FAIL_SCAN_SQL = """
+    UPDATE scan_events
+    SET ended_at = ?, status = 'failed', error_message = ?,
+        new_count = ?, updated_count = ?
+    WHERE id = ?
+"""
+
+UPDATE_LAST_SCAN_SQL = "UPDATE folder_roots SET last_scan_time = ? WHERE id = ?"
+
+
+async def _get_scan_writer() -> aiosqlite.Connection:
+    """Get the shared scan writer connection, opening it on first use"""
+    global _scan_writer
+    if _scan_writer is None:
+        _scan_writer = await aiosqlite.connect(
+            DB_PATH, cached_statements=DB_STATEMENT_CACHE_SIZE
+        )
+        await configure_connection(_scan_writer)
+    return _scan_writer
+
+async def close_scan_writer():
+    """Close the shared scan writer connection"""
+    global _scan_writer
+    if _scan_writer is not None:
+        await _scan_writer.close()
+        _scan_writer = None
+
+@asynccontextmanager
+async def _scan_transaction(db: aiosqlite.Connection):
+    """Run one short scan write transaction under the writer lock"""
+    async with _scan_writer_lock:
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            # Roll back before releasing the lock so another scan never
+            # starts its transaction on top of this one
+            await db.rollback()
+            raise
+        await db.commit()
+    bump_catalog_version()
+
+async def _apply_scan(
+    db: aiosqlite.Connection, root_id: int, root_data: dict, scan_id: int, full_scan: bool = False
+):
+    """Stream a directory scan into the database, one short transaction per batch"""
+    # Stage scanned paths so missing and present rows can be found in bulk
+    async with _scan_writer_lock:
+        await db.execute(CREATE_SCANNED_PATHS_SQL)
+    
+    new_count = updated_count = 0
+    progress = _scan_progress.setdefault(scan_id, {})
+    progress.update(new_count=0, updated_count=0, deleted_count=0)
+    # All rows written by this scan share one timestamp
+    now = sql_timestamp()
+    
+    batches = iter_script_batches(
+        root_data['path'],
+        root_data['recursive'],
+        root_data['include_patterns'],
+        root_data['exclude_patterns'],
+        root_data['follow_symlinks'],
+        root_data['max_file_size']
+    )
+    async with aclosing(batches):
+        async for scripts in batches:
+            paths = [s['path'] for s in scripts]
+            # Pad with NULLs (which never match) so every batch reuses one statement
+            padded_paths = paths + [None] * (SCAN_BATCH_SIZE - len(paths))
             
-            new_count = 0
-            updated_count = 0
-            deleted_count = 0
+            # Walking and hashing happen outside any transaction and outside the
+            # writer lock, so neither API writes nor other scans wait on file I/O
+            async with _scan_writer_lock:
+                async with db.execute(PRELOAD_SCRIPTS_SQL, padded_paths) as cursor:
+                    existing = {row[0]: row[1:] for row in await cursor.fetchall()}
             
-            # Process scanned scripts
+            # Only read and hash files whose size or mtime changed since the
+            # last scan, unless a full scan was requested
+            to_hash = []
             for script in scripts:
-                # Check if script already exists
-                async with db.execute(
-                    "SELECT id, hash, mtime FROM scripts WHERE path = ?",
-                    (script['path'],)
-                ) as cursor:
-                    existing = await cursor.fetchone()
-                
-                if existing:
-                    # Update if changed
-                    if (
-                        existing[1] != script['hash']
-                        or _normalize_mtime(existing[2]) != _normalize_mtime(script['mtime'])
-                    ):
-                        await db.execute(
-                            """
-                            UPDATE scripts 
-                            SET name = ?, extension = ?, language = ?, size = ?,
-                                mtime = ?, hash = ?, line_count = ?, missing_flag = 0,
-                                updated_at = CURRENT_TIMESTAMP
-                            WHERE id = ?
-                            """,
-                            (
-                                script['name'], script['extension'], script['language'],
-                                script['size'], script['mtime'], script['hash'],
-                                script['line_count'], existing[0]
-                            )
-                        )
-                        updated_count += 1
-                    else:
-                        # Mark as not missing
-                        await db.execute(
-                            "UPDATE scripts SET missing_flag = 0 WHERE id = ?",
-                            (existing[0],)
-                        )
+                row = existing.get(script['path'])
+                if (
+                    not full_scan and row is not None and row[0] == script['size']
+                    and (row[1] or '')[:19] == script['mtime']
+                ):
+                    script['hash'], script['line_count'] = row[2], row[3]
                 else:
-                    # Insert new script
-                    await db.execute(
-                        """
-                        INSERT INTO scripts (root_id, path, name, extension, language,
-                                           size, mtime, hash, line_count)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
+                    to_hash.append(script)
+            await hash_scripts(to_hash)
+            
+            async with _scan_transaction(db):
+                await db.executemany(
+                    INSERT_SCANNED_PATH_SQL, ((scan_id, path) for path in paths)
+                )
+                # Recount under the write lock in case the watcher added rows meanwhile
+                async with db.execute(COUNT_EXISTING_SCRIPTS_SQL, padded_paths) as cursor:
+                    batch_new = len(paths) - (await cursor.fetchone())[0]
+                
+                # Unchanged rows are skipped by the upsert's WHERE clause, so the row
+                # count is exactly the inserted plus updated scripts
+                cursor = await db.executemany(
+                    UPSERT_SCRIPT_SQL,
+                    (
                         (
                             root_id, script['path'], script['name'], script['extension'],
                             script['language'], script['size'], script['mtime'],
-                            script['hash'], script['line_count']
+                            script['hash'], script['line_count'], now, now
                         )
+                        for script in scripts
                     )
-                    new_count += 1
-            
-            # Mark missing scripts
-            scanned_paths = {s['path'] for s in scripts}
-            async with db.execute(
-                "SELECT id, path FROM scripts WHERE root_id = ? AND missing_flag = 0",
-                (root_id,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                for row in rows:
-                    if row[1] not in scanned_paths:
-                        await db.execute(
-                            "UPDATE scripts SET missing_flag = 1 WHERE id = ?",
-                            (row[0],)
-                        )
-                        deleted_count += 1
-            
-            # Update scan event with success
-            ended_at = datetime.now()
-            await db.execute(
-                """
-                UPDATE scan_events
-                SET ended_at = ?, status = 'completed',
-                    new_count = ?, updated_count = ?, deleted_count = ?
-                WHERE id = ?
-                """,
-                (ended_at, new_count, updated_count, deleted_count, scan_id)
-            )
-            
-            # Update folder root scan time
-            await db.execute(
-                "UPDATE folder_roots SET last_scan_time = ? WHERE id = ?",
-                (ended_at, root_id)
-            )
+                )
             
-            await db.commit()
+            new_count += batch_new
+            updated_count += cursor.rowcount - batch_new
+            progress.update(new_count=new_count, updated_count=updated_count)
     
+    # Missing scripts are only known once the walk is complete
+    async with _scan_transaction(db):
+        # Mark as not missing
+        await db.execute(MARK_PRESENT_SQL, (scan_id,))
+        
+        # Mark missing scripts
+        cursor = await db.execute(MARK_MISSING_SQL, (root_id, scan_id))
+        deleted_count = cursor.rowcount
+        progress['deleted_count'] = deleted_count
+        
+        # Update scan event with success
+        ended_at = datetime.now()
+        await db.execute(
+            COMPLETE_SCAN_SQL, (ended_at, new_count, updated_count, deleted_count, scan_id)
+        )
+        
+        # Update folder root scan time
+        await db.execute(UPDATE_LAST_SCAN_SQL, (ended_at, root_id))
+        
+        await db.execute(CLEAR_SCANNED_PATHS_SQL, (scan_id,))
+
+async def _perform_scan_background(
+    root_id: int, root_data: dict, scan_id: int, full_scan: bool = False
+):
+    """Background task to perform the actual scanning"""
+    async with _scan_writer_lock:
+        db = await _get_scan_writer()
+    try:
+        await _apply_scan(db, root_id, root_data, scan_id, full_scan)
     except Exception as e:
-        # Update scan event with error
-        async with aiosqlite.connect(DB_PATH) as db:
+        # The unfinished batch was rolled back, but earlier batches stay
+        # committed and missing scripts were never marked; record both
+        progress = _scan_progress.get(scan_id, {})
+        message = (
+            f"{e} (scripts from batches written before the failure were kept; "
+            "missing scripts were not marked)"
+        )
+        async with _scan_writer_lock:
+            await db.execute(CLEAR_SCANNED_PATHS_SQL, (scan_id,))
             await db.execute(
-                """
-                UPDATE scan_events
-                SET ended_at = ?, status = 'failed', error_message = ?
-                WHERE id = ?
-                """,
-                (datetime.now(), str(e), scan_id)
+                FAIL_SCAN_SQL,
+                (
+                    datetime.now(), message, progress.get('new_count', 0),
+                    progress.get('updated_count', 0), scan_id
+                )
             )
             await db.commit()
+    finally:
+        _scan_progress.pop(scan_id, None)
 
-@router.post("/{root_id}/scan", response_model=ScanResponse)
+@router.post("/{root_id}/scan", status_code=202, response_model=None)
 async def scan_folder_root(
     root_id: int,
     scan_request: ScanRequest,
@@ -239,19 +356,12 @@ async def scan_folder_root(
     await db.commit()
     
     # Schedule scan as background task
-    background_tasks.add_task(_perform_scan_background, root_id, root, scan_id)
+    background_tasks.add_task(
+        _perform_scan_background, root_id, root, scan_id, scan_request.full_scan
+    )
     
-    # Return immediately with scan ID
-    return {
-        'scan_id': scan_id,
-        'status': 'running',
-        'new_count': 0,
-        'updated_count': 0,
-        'deleted_count': 0,
-        'error_count': 0,
-        'started_at': started_at,
-        'ended_at': None
-    }
+    # Return immediately with scan ID; progress is polled via get_scan_status
+    return {'scan_id': scan_id, 'status': 'running'}
 
 @router.get("/{root_id}/scan/{scan_id}")
 async def get_scan_status(
@@ -260,26 +370,32 @@ async def get_scan_status(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Get the status of a scan operation"""
-    # Verify root exists
-    async with db.execute("SELECT id FROM folder_roots WHERE id = ?", (root_id,)) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Folder root not found")
-    
-    # Get scan event
+    # One lookup tells apart an unknown root from an unknown scan
     async with db.execute(
-        "SELECT id, status, new_count, updated_count, deleted_count, error_message, started_at, ended_at FROM scan_events WHERE id = ? AND root_id = ?",
+        """
+        SELECT se.id, se.status, se.new_count, se.updated_count, se.deleted_count,
+               se.error_message, se.started_at, se.ended_at
+        FROM folder_roots fr
+        LEFT JOIN scan_events se ON se.root_id = fr.id AND se.id = ?
+        WHERE fr.id = ?
+        """,
         (scan_id, root_id)
     ) as cursor:
         row = await cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Scan not found")
+    if not row:
+        raise HTTPException(status_code=404, detail="Folder root not found")
+    if row[0] is None:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    
+    # Totals are written at the end of the scan; report live counters until then
+    counts = _scan_progress.get(scan_id, {}) if row[1] == 'running' else {}
     
     return {
         'scan_id': row[0],
         'status': row[1],
-        'new_count': row[2] or 0,
-        'updated_count': row[3] or 0,
-        'deleted_count': row[4] or 0,
+        'new_count': counts.get('new_count', row[2] or 0),
+        'updated_count': counts.get('updated_count', row[3] or 0),
+        'deleted_count': counts.get('deleted_count', row[4] or 0),
         'error_message': row[5],
         'started_at': row[6],
         'ended_at': row[7]
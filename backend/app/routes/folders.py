@@ -1,8 +1,9 @@
 """
 Folders API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional
 import aiosqlite
 
 from app.db.database import get_db
@@ -10,22 +11,40 @@ from app.models.schemas import FolderResponse, FolderNoteUpdate
 
 router = APIRouter()
 
+FOLDER_COLUMNS = (
+    "id, root_id, path, parent_id, note, "
+    "strftime('%Y-%m-%dT%H:%M:%S', created_at) AS created_at"
+)
+
 @router.get("/", response_model=List[FolderResponse])
 async def list_folders(
     root_id: int = None,
+    after: Optional[str] = Query(None, description="Return folders whose path sorts after this one"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; all folders when omitted"),
     db: aiosqlite.Connection = Depends(get_db)
 ):
-    """List all folders, optionally filtered by root"""
+    """List folders ordered by path, optionally filtered by root (keyset paginated)"""
+    conditions = []
+    params = []
     if root_id:
-        query = "SELECT * FROM folders WHERE root_id = ? ORDER BY path"
-        params = (root_id,)
-    else:
-        query = "SELECT * FROM folders ORDER BY path"
-        params = ()
+        conditions.append("root_id = ?")
+        params.append(root_id)
+    if after is not None:
+        conditions.append("path > ?")
+        params.append(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    page = ""
+    if limit is not None:
+        page = "LIMIT ?"
+        params.append(limit)
     
-    async with db.execute(query, params) as cursor:
+    async with db.execute(
+        f"SELECT {FOLDER_COLUMNS} FROM folders {where} ORDER BY folders.path {page}",
+        params
+    ) as cursor:
+        columns = [c[0] for c in cursor.description]
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+    return ORJSONResponse([dict(zip(columns, row)) for row in rows])
 
 @router.get("/{folder_id}", response_model=FolderResponse)
 async def get_folder(folder_id: int, db: aiosqlite.Connection = Depends(get_db)):
@@ -43,16 +62,13 @@ async def update_folder_note(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Update or create a note for a folder"""
-    # Check if folder exists
-    async with db.execute("SELECT id FROM folders WHERE id = ?", (folder_id,)) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Folder not found")
-    
     # Update the note
-    await db.execute(
+    cursor = await db.execute(
         "UPDATE folders SET note = ? WHERE id = ?",
         (note_update.note, folder_id)
     )
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Folder not found")
     await db.commit()
     
     return {"message": "Folder note updated successfully"}
@@ -60,16 +76,13 @@ async def update_folder_note(
 @router.delete("/{folder_id}/note")
 async def delete_folder_note(folder_id: int, db: aiosqlite.Connection = Depends(get_db)):
     """Delete a folder note"""
-    # Check if folder exists
-    async with db.execute("SELECT id FROM folders WHERE id = ?", (folder_id,)) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Folder not found")
-    
     # Clear the note
-    await db.execute(
+    cursor = await db.execute(
         "UPDATE folders SET note = NULL WHERE id = ?",
         (folder_id,)
     )
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Folder not found")
     await db.commit()
     
     return {"message": "Folder note deleted successfully"}
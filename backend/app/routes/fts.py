@@ -5,12 +5,12 @@ from fastapi import APIRouter, Depends, HTTPException
 import aiosqlite
 
 from app.db.database import get_db
-from app.models.schemas import FTSSearchRequest, PaginatedResponse
+from app.models.schemas import FTSSearchRequest, FTSSearchResponse
 from app.services.fts import search_fts, rebuild_fts_index
 
 router = APIRouter()
 
-@router.post("/", response_model=PaginatedResponse)
+@router.post("/", response_model=FTSSearchResponse)
 async def fts_search(
     search: FTSSearchRequest,
     db: aiosqlite.Connection = Depends(get_db)
@@ -19,18 +19,14 @@ async def fts_search(
     Perform full-text search across script content and notes
     Requires FTS indexing to be enabled on folder roots
     """
-    try:
-        result = await search_fts(
-            db,
-            search.query,
-            search.search_content,
-            search.search_notes,
-            search.page,
-            search.page_size
-        )
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"FTS search failed: {str(e)}")
+    return await search_fts(
+        db,
+        search.query,
+        search.search_content,
+        search.search_notes,
+        search.page,
+        search.page_size
+    )
 
 @router.post("/rebuild")
 async def rebuild_index(
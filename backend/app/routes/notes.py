@@ -2,15 +2,24 @@
 Notes API endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from functools import lru_cache
+from html import escape
 from typing import List
 import aiosqlite
 
-from app.db.database import get_db
+from app.db.database import get_db, sql_timestamp
 from app.models.schemas import NoteCreate, NoteResponse
 from app.services.markdown import render_markdown, extract_markdown_preview
 
 router = APIRouter()
 
+NOTE_COLUMNS = """
+    id, script_id, content, is_markdown,
+    replace(created_at, ' ', 'T') AS created_at,
+    replace(updated_at, ' ', 'T') AS updated_at
+"""
+
 @router.get("/script/{script_id}", response_model=List[NoteResponse])
 async def get_script_notes(script_id: int, db: aiosqlite.Connection = Depends(get_db)):
     """Get all notes for a script"""
@@ -19,11 +28,22 @@ async def get_script_notes(script_id: int, db: aiosqlite.Connection = Depends(ge
             raise HTTPException(status_code=404, detail="Script not found")
     
     async with db.execute(
-        "SELECT * FROM script_notes WHERE script_id = ? ORDER BY updated_at DESC",
+        f"""
+        SELECT {NOTE_COLUMNS} FROM script_notes
+        WHERE script_id = ? ORDER BY script_notes.updated_at DESC
+        """,
         (script_id,)
     ) as cursor:
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        # Resolve the column names once rather than per row
+        columns = tuple(column[0] for column in cursor.description)
+    # Rows come straight from our own schema, so skip response_model validation
+    notes = []
+    for row in rows:
+        note = dict(zip(columns, row))
+        note['is_markdown'] = bool(note['is_markdown'])
+        notes.append(note)
+    return ORJSONResponse(notes)
 
 @router.post("/script/{script_id}", response_model=NoteResponse)
 async def create_script_note(
@@ -32,15 +52,18 @@ async def create_script_note(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Create a new note for a script"""
-    async with db.execute("SELECT id FROM scripts WHERE id = ?", (script_id,)) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Script not found")
-    
-    cursor = await db.execute(
-        "INSERT INTO script_notes (script_id, content, is_markdown) VALUES (?, ?, ?)",
-        (script_id, note.content, note.is_markdown)
-    )
-    note_id = cursor.lastrowid
+    # Selecting from scripts makes the insert a no-op for unknown scripts
+    async with db.execute(
+        """
+        INSERT INTO script_notes (script_id, content, is_markdown)
+        SELECT id, ?, ? FROM scripts WHERE id = ?
+        RETURNING *
+        """,
+        (note.content, note.is_markdown, script_id)
+    ) as cursor:
+        row = await cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Script not found")
     
     # Log the change
     await db.execute(
@@ -52,13 +75,7 @@ async def create_script_note(
     )
     
     await db.commit()
-    
-    async with db.execute(
-        "SELECT * FROM script_notes WHERE id = ?",
-        (note_id,)
-    ) as cursor:
-        row = await cursor.fetchone()
-        return dict(row)
+    return dict(row)
 
 @router.put("/{note_id}", response_model=NoteResponse)
 async def update_note(
@@ -67,53 +84,40 @@ async def update_note(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Update an existing note"""
-    async with db.execute(
-        "SELECT script_id, content, is_markdown FROM script_notes WHERE id = ?",
-        (note_id,)
-    ) as cursor:
-        note_row = await cursor.fetchone()
-        if not note_row:
-            raise HTTPException(status_code=404, detail="Note not found")
-        script_id = note_row[0]
-        old_content = note_row[1]
-    
-    await db.execute(
-        "UPDATE script_notes SET content = ?, is_markdown = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (note.content, note.is_markdown, note_id)
-    )
-    
-    # Log the change
-    await db.execute(
+    # Log the change first, while the old content is still in place; no row is
+    # logged when the note does not exist
+    cursor = await db.execute(
         """
         INSERT INTO change_log (script_id, change_type, old_value, new_value)
-        VALUES (?, 'note_updated', ?, ?)
+        SELECT script_id, 'note_updated', substr(content, 1, 100), ?
+        FROM script_notes WHERE id = ?
         """,
-        (script_id, old_content[:100], note.content[:100])
+        (note.content[:100], note_id)
     )
-    
-    await db.commit()
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Note not found")
     
     async with db.execute(
-        "SELECT * FROM script_notes WHERE id = ?",
-        (note_id,)
+        "UPDATE script_notes SET content = ?, is_markdown = ?, updated_at = ? WHERE id = ? RETURNING *",
+        (note.content, note.is_markdown, sql_timestamp(), note_id)
     ) as cursor:
         row = await cursor.fetchone()
-        return dict(row)
+    
+    await db.commit()
+    return dict(row)
 
 @router.delete("/{note_id}")
 async def delete_note(note_id: int, db: aiosqlite.Connection = Depends(get_db)):
     """Delete a note"""
     async with db.execute(
-        "SELECT script_id, content FROM script_notes WHERE id = ?",
+        # Only the logged prefix of the content is copied out of SQLite
+        "DELETE FROM script_notes WHERE id = ? RETURNING script_id, substr(content, 1, 100)",
         (note_id,)
     ) as cursor:
         note_row = await cursor.fetchone()
-        if not note_row:
-            raise HTTPException(status_code=404, detail="Note not found")
-        script_id = note_row[0]
-        old_content = note_row[1]
-    
-    await db.execute("DELETE FROM script_notes WHERE id = ?", (note_id,))
+    if not note_row:
+        raise HTTPException(status_code=404, detail="Note not found")
+    script_id, old_value = note_row
     
     # Log the change
     await db.execute(
@@ -121,49 +125,59 @@ async def delete_note(note_id: int, db: aiosqlite.Connection = Depends(get_db)):
         INSERT INTO change_log (script_id, change_type, old_value)
         VALUES (?, 'note_deleted', ?)
         """,
-        (script_id, old_content[:100])
+        (script_id, old_value)
     )
     
     await db.commit()
     return {"message": "Note deleted successfully"}
 
+@lru_cache(maxsize=1024)
+def _render_note_cached(note_id: int, updated_at: str, content: str, is_markdown: bool) -> dict:
+    """Render a stored note; an update changes updated_at, so stale entries age out"""
+    if not is_markdown:
+        # Return plain text, escaped and wrapped in <pre> tag
+        return {
+            "html": f"<pre>{escape(content)}</pre>",
+            "is_markdown": False,
+            "preview": content[:200]
+        }
+    
+    # Render markdown
+    return {
+        "html": render_markdown(content, safe=True),
+        "is_markdown": True,
+        "preview": extract_markdown_preview(content)
+    }
+
 @router.get("/{note_id}/render")
 async def render_note(note_id: int, db: aiosqlite.Connection = Depends(get_db)):
     """Render a markdown note to HTML"""
     async with db.execute(
-        "SELECT content, is_markdown FROM script_notes WHERE id = ?",
+        "SELECT content, is_markdown, updated_at FROM script_notes WHERE id = ?",
         (note_id,)
     ) as cursor:
         note_row = await cursor.fetchone()
         if not note_row:
             raise HTTPException(status_code=404, detail="Note not found")
         
-        content, is_markdown = note_row
-    
-    if not is_markdown:
-        # Return plain text wrapped in <pre> tag
-        return {
-            "html": f"<pre>{content}</pre>",
-            "is_markdown": False,
-            "preview": content[:200]
-        }
+        content, is_markdown, updated_at = note_row
     
-    # Render markdown
-    html = render_markdown(content, safe=True)
-    preview = extract_markdown_preview(content)
+    if not content or not content.strip():
+        return {"html": "", "is_markdown": bool(is_markdown), "preview": ""}
     
-    return {
-        "html": html,
-        "is_markdown": True,
-        "preview": preview
-    }
+    # Content is part of the key too: updated_at only has second precision
+    return _render_note_cached(note_id, str(updated_at), content, bool(is_markdown))
 
 @router.post("/preview")
 async def preview_markdown(note: NoteCreate):
     """Preview markdown rendering without saving"""
+    if not note.content.strip():
+        # Nothing to render; skip Markdown and bleach entirely
+        return {"html": "", "is_markdown": note.is_markdown, "preview": ""}
+    
     if not note.is_markdown:
         return {
-            "html": f"<pre>{note.content}</pre>",
+            "html": f"<pre>{escape(note.content)}</pre>",
             "is_markdown": False,
             "preview": note.content[:200]
         }
@@ -1,30 +1,45 @@
 """
 Saved Searches API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from typing import List, Optional
 import aiosqlite
-import json
+import orjson
 
 from app.db.database import get_db
 from app.models.schemas import SavedSearchCreate, SavedSearchResponse
 
 router = APIRouter()
 
+# Each row rendered as a JSON object by SQLite; query_params is already JSON
+# text, so it is embedded as-is instead of being parsed and re-serialized
+SAVED_SEARCH_JSON = """
+    json_object(
+        'id', id,
+        'name', name,
+        'description', description,
+        'query_params', json(query_params),
+        'is_pinned', json(CASE WHEN is_pinned THEN 'true' ELSE 'false' END),
+        'created_at', replace(created_at, ' ', 'T'),
+        'updated_at', replace(updated_at, ' ', 'T')
+    )
+"""
+
 @router.get("/", response_model=List[SavedSearchResponse])
-async def list_saved_searches(db: aiosqlite.Connection = Depends(get_db)):
-    """List all saved searches"""
+async def list_saved_searches(
+    limit: Optional[int] = Query(None, ge=1),
+    db: aiosqlite.Connection = Depends(get_db)
+):
+    """List saved searches, pinned first"""
+    # LIMIT -1 is unlimited in SQLite, so one statement serves both cases
     async with db.execute(
-        "SELECT * FROM saved_searches ORDER BY is_pinned DESC, name"
+        f"SELECT {SAVED_SEARCH_JSON} FROM saved_searches ORDER BY is_pinned DESC, name LIMIT ?",
+        (limit or -1,)
     ) as cursor:
         rows = await cursor.fetchall()
-        results = []
-        for row in rows:
-            item = dict(row)
-            # Parse JSON query_params
-            item['query_params'] = json.loads(item['query_params'])
-            results.append(item)
-        return results
+    body = "[" + ",".join(row[0] for row in rows) + "]"
+    return Response(content=body, media_type="application/json")
 
 @router.post("/", response_model=SavedSearchResponse)
 async def create_saved_search(
@@ -34,41 +49,35 @@ async def create_saved_search(
     """Create a new saved search"""
     try:
         # Serialize query_params to JSON
-        query_params_json = json.dumps(search.query_params)
+        query_params_json = orjson.dumps(search.query_params).decode()
         
-        cursor = await db.execute(
+        async with db.execute(
             """
             INSERT INTO saved_searches (name, description, query_params, is_pinned)
             VALUES (?, ?, ?, ?)
+            RETURNING *
             """,
             (search.name, search.description, query_params_json, search.is_pinned)
-        )
-        await db.commit()
-        
-        async with db.execute(
-            "SELECT * FROM saved_searches WHERE id = ?",
-            (cursor.lastrowid,)
         ) as cursor:
             row = await cursor.fetchone()
-            result = dict(row)
-            result['query_params'] = json.loads(result['query_params'])
-            return result
+        await db.commit()
     except aiosqlite.IntegrityError:
         raise HTTPException(status_code=400, detail="Saved search with this name already exists")
+    
+    # The request already carries the parsed query_params; no need to reparse
+    return {**dict(row), 'query_params': search.query_params}
 
 @router.get("/{search_id}", response_model=SavedSearchResponse)
 async def get_saved_search(search_id: int, db: aiosqlite.Connection = Depends(get_db)):
     """Get a specific saved search"""
     async with db.execute(
-        "SELECT * FROM saved_searches WHERE id = ?",
+        f"SELECT {SAVED_SEARCH_JSON} FROM saved_searches WHERE id = ?",
         (search_id,)
     ) as cursor:
         row = await cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Saved search not found")
-        result = dict(row)
-        result['query_params'] = json.loads(result['query_params'])
-        return result
+    if not row:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    return Response(content=row[0], media_type="application/json")
 
 @router.put("/{search_id}", response_model=SavedSearchResponse)
 async def update_saved_search(
@@ -77,45 +86,34 @@ async def update_saved_search(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Update a saved search"""
-    async with db.execute(
-        "SELECT id FROM saved_searches WHERE id = ?",
-        (search_id,)
-    ) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Saved search not found")
+    query_params_json = orjson.dumps(search.query_params).decode()
     
-    query_params_json = json.dumps(search.query_params)
-    
-    await db.execute(
-        """
-        UPDATE saved_searches
-        SET name = ?, description = ?, query_params = ?, is_pinned = ?,
-            updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-        """,
-        (search.name, search.description, query_params_json, search.is_pinned, search_id)
-    )
+    try:
+        async with db.execute(
+            """
+            UPDATE saved_searches
+            SET name = ?, description = ?, query_params = ?, is_pinned = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            RETURNING *
+            """,
+            (search.name, search.description, query_params_json, search.is_pinned, search_id)
+        ) as cursor:
+            row = await cursor.fetchone()
+    except aiosqlite.IntegrityError:
+        raise HTTPException(status_code=400, detail="Saved search with this name already exists")
+    if not row:
+        raise HTTPException(status_code=404, detail="Saved search not found")
     await db.commit()
     
-    async with db.execute(
-        "SELECT * FROM saved_searches WHERE id = ?",
-        (search_id,)
-    ) as cursor:
-        row = await cursor.fetchone()
-        result = dict(row)
-        result['query_params'] = json.loads(result['query_params'])
-        return result
+    # The request already carries the parsed query_params; no need to reparse
+    return {**dict(row), 'query_params': search.query_params}
 
 @router.delete("/{search_id}")
 async def delete_saved_search(search_id: int, db: aiosqlite.Connection = Depends(get_db)):
     """Delete a saved search"""
-    async with db.execute(
-        "SELECT id FROM saved_searches WHERE id = ?",
-        (search_id,)
-    ) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Saved search not found")
-    
-    await db.execute("DELETE FROM saved_searches WHERE id = ?", (search_id,))
+    cursor = await db.execute("DELETE FROM saved_searches WHERE id = ?", (search_id,))
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Saved search not found")
     await db.commit()
     return {"message": "Saved search deleted successfully"}
@@ -19,7 +19,7 @@ from typing import List, Optional
 import aiosqlite
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
 
-from app.db.database import get_db, DB_PATH
+from app.db.database import get_db, configure_connection, DB_PATH
 from app.models.schemas import (
     ScheduleJobCreate, ScheduleJobResponse, ScheduleJobUpdate,
     JobExecutionResponse,
@@ -396,6 +396,7 @@ async def _run_job_execution(
         duration = (ended_at - started_at).total_seconds()
 
         async with aiosqlite.connect(DB_PATH) as db:
+            await configure_connection(db)
             db.row_factory = aiosqlite.Row
             current_exec_id = execution_id  # safe default; overridden for retries below
             if attempt == 0:
@@ -466,6 +467,7 @@ async def _check_zombie_duration(job_id: int, current_duration: float, execution
     UNDER_FRACTION = 0.20   # flag if current < avg * 0.20
 
     async with aiosqlite.connect(DB_PATH) as db:
+        await configure_connection(db)
         db.row_factory = aiosqlite.Row
         async with db.execute(
             """
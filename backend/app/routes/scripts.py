@@ -2,12 +2,21 @@
 Scripts API endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional
-from datetime import datetime
+from fastapi.responses import ORJSONResponse
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+import base64
+import binascii
 import os
+import time
+import aiofiles
+import aiofiles.os
 import aiosqlite
+import orjson
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db, catalog_version, bump_catalog_version
 from app.models.schemas import (
     ScriptResponse, StatusUpdate, PaginatedResponse,
     BulkTagRequest, BulkStatusRequest
@@ -15,22 +24,301 @@ from app.models.schemas import (
 
 router = APIRouter()
 
+# Script listings are cached briefly, so dashboards polling the same page or
+# the duplicate report don't rerun the queries. Entries also lapse as soon as
+# the catalogue version moves on.
+LIST_CACHE_TTL_SECONDS = 30
+LIST_CACHE_MAX_SIZE = 256
+_list_cache: Dict[tuple, Tuple[float, int, Any]] = {}
+
+
+def _get_cached_listing(key: tuple) -> Optional[Any]:
+    """Return a cached listing if it is still fresh and current"""
+    cached = _list_cache.get(key)
+    if cached and cached[0] > time.monotonic() and cached[1] == catalog_version():
+        return cached[2]
+    return None
+
+
+def _cache_listing(key: tuple, version: int, value: Any):
+    """Cache a listing computed against the given catalogue version"""
+    if len(_list_cache) >= LIST_CACHE_MAX_SIZE:
+        _list_cache.pop(next(iter(_list_cache)))
+    _list_cache[key] = (time.monotonic() + LIST_CACHE_TTL_SECONDS, version, value)
+
+# change_log entries for a single tag change; the tag's name is looked up in
+# the same statement, falling back to its id
+# Joining scripts and tags makes the insert a no-op when either is unknown
+ADD_SCRIPT_TAG_SQL = """
+    INSERT INTO script_tags (script_id, tag_id)
+    SELECT scripts.id, tags.id FROM scripts, tags
+    WHERE scripts.id = ? AND tags.id = ?
+"""
+LOG_TAG_ADDED_SQL = """
+    INSERT INTO change_log (script_id, change_type, new_value)
+    VALUES (?, 'tag_added', COALESCE((SELECT name FROM tags WHERE id = ?), ?))
+"""
+# Selecting from scripts makes the log insert a no-op for unknown scripts
+LOG_TAG_REMOVED_SQL = """
+    INSERT INTO change_log (script_id, change_type, old_value)
+    SELECT id, 'tag_removed', COALESCE((SELECT name FROM tags WHERE id = ?), ?)
+    FROM scripts WHERE id = ?
+"""
+
+# Ids from a JSON array parameter that exist in scripts; one statement for any
+# number of ids, without hitting SQLite's bound-parameter limit
+EXISTING_SCRIPT_IDS_SQL = "SELECT id FROM scripts WHERE id IN (SELECT value FROM json_each(?))"
+
+# Scripts whose tags, status, notes and fields are loaded per export query
+EXPORT_BATCH_SIZE = 500
+_EXPORT_IDS = ','.join('?' * EXPORT_BATCH_SIZE)
+
+EXPORT_COLUMNS = (
+    'id', 'root_id', 'folder_id', 'path', 'name', 'extension', 'language',
+    'size', 'mtime', 'hash', 'line_count', 'missing_flag', 'created_at', 'updated_at'
+)
+EXPORT_SCRIPTS_SQL = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM scripts"
+
+EXPORT_TAGS_SQL = f"""
+    SELECT st.script_id, t.name, t.group_name, t.color
+    FROM script_tags st
+    JOIN tags t ON t.id = st.tag_id
+    WHERE st.script_id IN ({_EXPORT_IDS})
+"""
+EXPORT_STATUS_SQL = f"SELECT * FROM script_status WHERE script_id IN ({_EXPORT_IDS})"
+EXPORT_NOTES_SQL = f"""
+    SELECT script_id, content, updated_at FROM script_notes
+    WHERE script_id IN ({_EXPORT_IDS})
+    ORDER BY updated_at DESC
+"""
+EXPORT_FIELDS_SQL = f"SELECT script_id, key, value FROM script_fields WHERE script_id IN ({_EXPORT_IDS})"
+
+# Largest file get_script_content will return
+SCRIPT_CONTENT_MAX_BYTES = int(os.getenv("SCRIPT_CONTENT_MAX_BYTES", "10485760"))
+
+# Folder roots are a small, fixed set of paths, so their normalized form is
+# memoized
+_root_abspath = lru_cache(maxsize=256)(os.path.abspath)
+
+# A script with its tags (as a JSON array), status and latest note; status
+# columns are NULL for a script without a status row
+GET_SCRIPT_SQL = """
+    SELECT s.id, s.root_id, s.folder_id, s.path, s.name, s.extension, s.language,
+           s.size, s.mtime, s.hash, s.line_count, s.missing_flag, s.created_at, s.updated_at,
+           st.status, st.classification, st.owner, st.environment,
+           st.deprecated_date, st.migration_note,
+           (SELECT content FROM script_notes
+            WHERE script_id = s.id
+            ORDER BY updated_at DESC LIMIT 1) AS notes,
+           (SELECT json_group_array(t.name) FROM script_tags sct
+            JOIN tags t ON t.id = sct.tag_id
+            WHERE sct.script_id = s.id) AS tags
+    FROM scripts s
+    LEFT JOIN script_status st ON st.script_id = s.id
+    WHERE s.id = ?
+"""
+
+# The existing status of a script; no row for an unknown script, NULLs for a
+# script without a status row
+STATUS_OLD_VALUES_SQL = """
+    SELECT st.script_id, st.status, st.classification, st.owner, st.environment
+    FROM scripts s
+    LEFT JOIN script_status st ON st.script_id = s.id
+    WHERE s.id = ?
+"""
+
+# Creates a script's status row, or updates the fields given (non-NULL) on
+# an existing one; a new row defaults to 'active'
+UPSERT_STATUS_SQL = """
+    INSERT INTO script_status (script_id, status, classification, owner,
+                               environment, deprecated_date, migration_note)
+    VALUES (?1, COALESCE(NULLIF(?2, ''), 'active'), ?3, ?4, ?5, ?6, ?7)
+    ON CONFLICT(script_id) DO UPDATE SET
+        status = COALESCE(?2, status),
+        classification = COALESCE(?3, classification),
+        owner = COALESCE(?4, owner),
+        environment = COALESCE(?5, environment),
+        deprecated_date = COALESCE(?6, deprecated_date),
+        migration_note = COALESCE(?7, migration_note),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE COALESCE(?2, ?3, ?4, ?5, ?6, ?7) IS NOT NULL
+"""
+
+# The same for every existing script in a JSON array of ids
+BULK_UPSERT_STATUS_SQL = """
+    INSERT INTO script_status (script_id, status, classification, owner, environment)
+    SELECT id, COALESCE(NULLIF(?1, ''), 'active'), ?2, ?3, ?4
+    FROM scripts WHERE id IN (SELECT value FROM json_each(?5))
+    ON CONFLICT(script_id) DO UPDATE SET
+        status = COALESCE(?1, status),
+        classification = COALESCE(?2, classification),
+        owner = COALESCE(?3, owner),
+        environment = COALESCE(?4, environment),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE COALESCE(?1, ?2, ?3, ?4) IS NOT NULL
+"""
+
+LOG_CHANGE_SQL = """
+    INSERT INTO change_log (script_id, change_type, old_value, new_value)
+    VALUES (?, ?, ?, ?)
+"""
+
+# JSON arrays survive paths containing any delimiter
+DUPLICATES_SQL = """
+    SELECT hash, COUNT(*) as count, json_group_array(path) as paths,
+           json_group_array(id) as ids
+    FROM scripts
+    WHERE hash IS NOT NULL AND hash != '' AND missing_flag = 0
+    GROUP BY hash
+    HAVING count > 1
+    ORDER BY count DESC, hash
+    LIMIT ? OFFSET ?
+"""
+
+DUPLICATE_GROUPS_COUNT_SQL = """
+    SELECT COUNT(*) FROM (
+        SELECT 1 FROM scripts
+        WHERE hash IS NOT NULL AND hash != '' AND missing_flag = 0
+        GROUP BY hash
+        HAVING COUNT(*) > 1
+    )
+"""
+
+# Joining from scripts yields no rows for an unknown script and a single
+# all-NULL change_log row for a script without (further) history. Entries
+# are paged newest first by id, optionally starting before a given entry.
+HISTORY_COLUMNS = ('id', 'event_time', 'change_type', 'old_value', 'new_value', 'actor')
+HISTORY_SQL = """
+    SELECT c.id, c.event_time, c.change_type, c.old_value, c.new_value, c.actor
+    FROM scripts s
+    LEFT JOIN change_log c ON c.script_id = s.id AND (?2 IS NULL OR c.id < ?2)
+    WHERE s.id = ?1
+    ORDER BY c.id DESC
+    LIMIT ?3
+"""
+
+SCRIPT_AND_ROOT_PATH_SQL = """
+    SELECT s.path, r.path
+    FROM scripts s
+    LEFT JOIN folder_roots r ON r.id = s.root_id
+    WHERE s.id = ?
+"""
+
+# As for history, an unknown script yields no rows
+CUSTOM_FIELDS_SQL = """
+    SELECT f.key, f.value
+    FROM scripts s
+    LEFT JOIN script_fields f ON f.script_id = s.id
+    WHERE s.id = ?
+"""
+
+# Largest page list_scripts will return
+MAX_PAGE_SIZE = 100
+
+# Tag names for a page of scripts, padded with NULLs (which never match) to a
+# full page so every page reuses one prepared statement
+PAGE_TAGS_SQL = f"""
+    SELECT sct.script_id, t.name
+    FROM script_tags sct
+    JOIN tags t ON t.id = sct.tag_id
+    WHERE sct.script_id IN ({','.join('?' * MAX_PAGE_SIZE)})
+    ORDER BY t.name
+"""
+
+
+
+# list_scripts builds its WHERE clause from a handful of optional filters, so
+# the statements for each shape are built once
+@lru_cache(maxsize=256)
+def _list_count_sql(where_clause: str, needs_status_join: bool) -> str:
+    """Count query for a list_scripts filter shape"""
+    # script_status has at most one row per script, so the join can't
+    # multiply rows and is only needed when filtering on status
+    status_join = "LEFT JOIN script_status st ON s.id = st.script_id" if needs_status_join else ""
+    return f"""
+        SELECT COUNT(*)
+        FROM scripts s
+        {status_join}
+        WHERE {where_clause}
+    """
+
+
+# Columns of a list_scripts page row; rows are zipped with these rather than
+# converted through aiosqlite.Row's by-name lookups
+LIST_COLUMNS = ('id', 'name', 'path', 'extension', 'language', 'size', 'mtime', 'status')
+
+
+@lru_cache(maxsize=256)
+def _list_page_sql(where_clause: str, sort_column: str, sort_direction: str) -> str:
+    """Page query for a list_scripts filter shape and sort order"""
+    return f"""
+        SELECT s.id, s.name, s.path, s.extension, s.language,
+               s.size, s.mtime, st.status
+        FROM scripts s
+        LEFT JOIN script_status st ON s.id = st.script_id
+        WHERE {where_clause}
+        ORDER BY {sort_column} {sort_direction}, s.id {sort_direction}
+        LIMIT ? OFFSET ?
+    """
+
+
+def _encode_cursor(sort_value: Any, script_id: int) -> str:
+    """Encode a list_scripts keyset cursor from the last row of a page"""
+    return base64.urlsafe_b64encode(orjson.dumps([sort_value, script_id])).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """Decode a list_scripts keyset cursor into its sort value and script id"""
+    try:
+        sort_value, script_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Only scalars can be bound as the sort value
+    if not isinstance(script_id, int) or not (
+        sort_value is None or isinstance(sort_value, (str, int, float))
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, script_id
+
+
+def _keyset_condition(sort_column: str, sort_direction: str, sort_value: Any) -> str:
+    """Condition selecting the rows after a cursor in (sort_column, s.id) order.
+
+    SQLite sorts NULLs first, so NULL sort values need their own branches.
+    """
+    op = '>' if sort_direction == 'ASC' else '<'
+    if sort_value is None:
+        if sort_direction == 'ASC':
+            return f"(({sort_column} IS NULL AND s.id > ?) OR {sort_column} IS NOT NULL)"
+        return f"({sort_column} IS NULL AND s.id < ?)"
+    if sort_direction == 'ASC':
+        return f"({sort_column}, s.id) > (?, ?)"
+    return f"(({sort_column}, s.id) < (?, ?) OR {sort_column} IS NULL)"
+
 
 @router.get("/", response_model=PaginatedResponse)
 async def list_scripts(
     page: int = Query(1, ge=1),
-    page_size: int = Query(50, ge=1, le=100),
+    page_size: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
     root_id: Optional[int] = None,
     language: Optional[str] = None,
     status: Optional[str] = None,
     search: Optional[str] = None,
     sort_by: str = Query("name"),
     sort_order: str = Query("asc"),
-    db: aiosqlite.Connection = Depends(get_db)
+    after: Optional[str] = None,
+    db: aiosqlite.Connection = Depends(get_read_db)
 ):
-    """List scripts with pagination and filters"""
+    """List scripts with pagination and filters
+
+    Pass the previous response's next_cursor as `after` to fetch the following
+    page by keyset, whose cost doesn't grow with depth. Paging by `page` alone
+    is deprecated.
+    """
     conditions = ["s.missing_flag = 0"]
     params = []
+    # Set by every filter on script_status columns, so the count query joins it
+    needs_status_join = False
     
     if root_id:
         conditions.append("s.root_id = ?")
@@ -43,6 +331,7 @@ async def list_scripts(
     if status:
         conditions.append("st.status = ?")
         params.append(status)
+        needs_status_join = True
     
     if search:
         conditions.append("(s.name LIKE ? OR s.path LIKE ?)")
@@ -67,104 +356,71 @@ async def list_scripts(
 
     where_clause = " AND ".join(conditions)
     
+    cache_key = ('scripts', where_clause, tuple(params), sort_column, sort_direction, page, page_size, after)
+    cached = _get_cached_listing(cache_key)
+    if cached is not None:
+        return cached
+    # Read the version before querying, so a concurrent write can't be cached
+    # under its newer version
+    version = catalog_version()
+    
     # Get total count
-    count_query = f"""
-        SELECT COUNT(DISTINCT s.id)
-        FROM scripts s
-        LEFT JOIN script_status st ON s.id = st.script_id
-        WHERE {where_clause}
-    """
-    async with db.execute(count_query, params) as cursor:
+    async with db.execute(_list_count_sql(where_clause, needs_status_join), params) as cursor:
         total = (await cursor.fetchone())[0]
     
-    # Get paginated results
-    offset = (page - 1) * page_size
-    query = f"""
-        SELECT DISTINCT s.id, s.name, s.path, s.extension, s.language, 
-               s.size, s.mtime, st.status,
-               GROUP_CONCAT(DISTINCT t.name) as tags
-        FROM scripts s
-        LEFT JOIN script_status st ON s.id = st.script_id
-        LEFT JOIN script_tags sct ON s.id = sct.script_id
-        LEFT JOIN tags t ON sct.tag_id = t.id
-        WHERE {where_clause}
-        GROUP BY s.id
-        ORDER BY {sort_column} {sort_direction}, s.id ASC
-        LIMIT ? OFFSET ?
-    """
+    # Get paginated results; tags are fetched separately so the join cannot
+    # multiply rows ahead of ORDER BY and LIMIT
+    if after:
+        sort_value, after_id = _decode_cursor(after)
+        where_clause += " AND " + _keyset_condition(sort_column, sort_direction, sort_value)
+        if sort_value is not None:
+            params.append(sort_value)
+        params.append(after_id)
+        offset = 0
+    else:
+        offset = (page - 1) * page_size
     params.extend([page_size, offset])
     
+    query = _list_page_sql(where_clause, sort_column, sort_direction)
     async with db.execute(query, params) as cursor:
-        rows = await cursor.fetchall()
-        items = []
-        for row in rows:
-            item = dict(row)
-            item['tags'] = item['tags'].split(',') if item.get('tags') else []
-            items.append(item)
+        items = [dict(zip(LIST_COLUMNS, row)) for row in await cursor.fetchall()]
+    
+    next_cursor = None
+    if len(items) == page_size:
+        last = items[-1]
+        next_cursor = _encode_cursor(last[sort_column.split('.')[1]], last['id'])
+    
+    if items:
+        ids = [item['id'] for item in items]
+        tags_by_script = defaultdict(list)
+        async with db.execute(PAGE_TAGS_SQL, ids + [None] * (MAX_PAGE_SIZE - len(ids))) as cursor:
+            for script_id, tag_name in await cursor.fetchall():
+                tags_by_script[script_id].append(tag_name)
+        for item in items:
+            item['tags'] = tags_by_script[item['id']]
     
     total_pages = (total + page_size - 1) // page_size
     
-    return {
+    result = {
         'items': items,
         'total': total,
         'page': page,
         'page_size': page_size,
-        'total_pages': total_pages
+        'total_pages': total_pages,
+        'next_cursor': next_cursor
     }
+    _cache_listing(cache_key, version, result)
+    return result
 
 @router.get("/{script_id}", response_model=ScriptResponse)
-async def get_script(script_id: int, db: aiosqlite.Connection = Depends(get_db)):
+async def get_script(script_id: int, db: aiosqlite.Connection = Depends(get_read_db)):
     """Get detailed script information"""
-    async with db.execute("SELECT * FROM scripts WHERE id = ?", (script_id,)) as cursor:
+    async with db.execute(GET_SCRIPT_SQL, (script_id,)) as cursor:
         row = await cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Script not found")
         script = dict(row)
-    
-    # Get tags
-    async with db.execute(
-        """
-        SELECT t.name FROM tags t
-        JOIN script_tags st ON t.id = st.tag_id
-        WHERE st.script_id = ?
-        """,
-        (script_id,)
-    ) as cursor:
-        tags = [row[0] for row in await cursor.fetchall()]
-    script['tags'] = tags
-    
-    # Get status
-    async with db.execute(
-        """
-        SELECT status, classification, owner, environment, deprecated_date, migration_note
-        FROM script_status
-        WHERE script_id = ?
-        """,
-        (script_id,)
-    ) as cursor:
-        status_row = await cursor.fetchone()
-        if status_row:
-            script['status'] = status_row[0]
-            script['classification'] = status_row[1]
-            script['owner'] = status_row[2]
-            script['environment'] = status_row[3]
-            script['deprecated_date'] = status_row[4]
-            script['migration_note'] = status_row[5]
-        else:
-            script['status'] = None
-            script['classification'] = None
-            script['owner'] = None
-            script['environment'] = None
-            script['deprecated_date'] = None
-            script['migration_note'] = None
-    
-    # Get notes
-    async with db.execute(
-        "SELECT content FROM script_notes WHERE script_id = ? ORDER BY updated_at DESC LIMIT 1",
-        (script_id,)
-    ) as cursor:
-        note_row = await cursor.fetchone()
-        script['notes'] = note_row[0] if note_row else None
+    script['tags'] = orjson.loads(script['tags'])
     
     return script
 
@@ -175,115 +431,44 @@ async def update_script_status(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Update script status and classification"""
-    # Check if script exists
-    async with db.execute("SELECT id FROM scripts WHERE id = ?", (script_id,)) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Script not found")
-    
-    # Get old values for change log
+    # Check the script exists and get old values for change log in one query
     old_values = {}
-    async with db.execute(
-        "SELECT status, classification, owner, environment FROM script_status WHERE script_id = ?",
-        (script_id,)
-    ) as cursor:
+    async with db.execute(STATUS_OLD_VALUES_SQL, (script_id,)) as cursor:
         old_row = await cursor.fetchone()
-        if old_row:
-            old_values = {
-                'status': old_row[0],
-                'classification': old_row[1],
-                'owner': old_row[2],
-                'environment': old_row[3]
-            }
-    
-    # Check if status record exists
-    exists = bool(old_values)
+    if not old_row:
+        raise HTTPException(status_code=404, detail="Script not found")
+    if old_row[0] is not None:
+        old_values = {
+            'status': old_row[1],
+            'classification': old_row[2],
+            'owner': old_row[3],
+            'environment': old_row[4]
+        }
     
-    if exists:
-        # Update existing status
-        update_fields = []
-        params = []
-        
-        if status_update.status is not None:
-            update_fields.append("status = ?")
-            params.append(status_update.status)
-        if status_update.classification is not None:
-            update_fields.append("classification = ?")
-            params.append(status_update.classification)
-        if status_update.owner is not None:
-            update_fields.append("owner = ?")
-            params.append(status_update.owner)
-        if status_update.environment is not None:
-            update_fields.append("environment = ?")
-            params.append(status_update.environment)
-        if status_update.deprecated_date is not None:
-            update_fields.append("deprecated_date = ?")
-            params.append(status_update.deprecated_date)
-        if status_update.migration_note is not None:
-            update_fields.append("migration_note = ?")
-            params.append(status_update.migration_note)
-        
-        if update_fields:
-            update_fields.append("updated_at = CURRENT_TIMESTAMP")
-            params.append(script_id)
-            query = f"UPDATE script_status SET {', '.join(update_fields)} WHERE script_id = ?"
-            await db.execute(query, params)
-    else:
-        # Insert new status
-        await db.execute(
-            """
-            INSERT INTO script_status (script_id, status, classification, owner, 
-                                      environment, deprecated_date, migration_note)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                script_id,
-                status_update.status or 'active',
-                status_update.classification,
-                status_update.owner,
-                status_update.environment,
-                status_update.deprecated_date,
-                status_update.migration_note
-            )
+    await db.execute(
+        UPSERT_STATUS_SQL,
+        (
+            script_id,
+            status_update.status,
+            status_update.classification,
+            status_update.owner,
+            status_update.environment,
+            status_update.deprecated_date,
+            status_update.migration_note
         )
+    )
     
     # Log status changes
-    if status_update.status is not None:
-        await db.execute(
-            """
-            INSERT INTO change_log (script_id, change_type, old_value, new_value)
-            VALUES (?, 'status_changed', ?, ?)
-            """,
-            (script_id, old_values.get('status', 'none'), status_update.status)
-        )
-    
-    if status_update.classification is not None:
-        await db.execute(
-            """
-            INSERT INTO change_log (script_id, change_type, old_value, new_value)
-            VALUES (?, 'classification_changed', ?, ?)
-            """,
-            (script_id, old_values.get('classification', 'none'), status_update.classification)
-        )
-    
-    if status_update.owner is not None:
-        await db.execute(
-            """
-            INSERT INTO change_log (script_id, change_type, old_value, new_value)
-            VALUES (?, 'owner_changed', ?, ?)
-            """,
-            (script_id, old_values.get('owner', 'none'), status_update.owner)
-        )
-    
-    if status_update.environment is not None:
-        await db.execute(
-            """
-            INSERT INTO change_log (script_id, change_type, old_value, new_value)
-            VALUES (?, 'environment_changed', ?, ?)
-            """,
-            (script_id, old_values.get('environment', 'none'), status_update.environment)
-        )
+    log_rows = [
+        (script_id, f"{field}_changed", old_values.get(field, 'none'), value)
+        for field in ('status', 'classification', 'owner', 'environment')
+        if (value := getattr(status_update, field)) is not None
+    ]
+    if log_rows:
+        await db.executemany(LOG_CHANGE_SQL, log_rows)
     
     await db.commit()
+    bump_catalog_version()
     return {"message": "Status updated successfully"}
 
 @router.post("/{script_id}/tags/{tag_id}")
@@ -294,29 +479,18 @@ async def add_tag_to_script(
 ):
     """Add a tag to a script"""
     try:
-        # Get tag name
-        async with db.execute("SELECT name FROM tags WHERE id = ?", (tag_id,)) as cursor:
-            tag_row = await cursor.fetchone()
-            tag_name = tag_row[0] if tag_row else str(tag_id)
-        
-        await db.execute(
-            "INSERT INTO script_tags (script_id, tag_id) VALUES (?, ?)",
-            (script_id, tag_id)
-        )
-        
-        # Log the change
-        await db.execute(
-            """
-            INSERT INTO change_log (script_id, change_type, new_value)
-            VALUES (?, 'tag_added', ?)
-            """,
-            (script_id, tag_name)
-        )
-        
-        await db.commit()
-        return {"message": "Tag added successfully"}
+        cursor = await db.execute(ADD_SCRIPT_TAG_SQL, (script_id, tag_id))
     except aiosqlite.IntegrityError:
         raise HTTPException(status_code=400, detail="Tag already added to script")
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Script or tag not found")
+    
+    # Log the change
+    await db.execute(LOG_TAG_ADDED_SQL, (script_id, tag_id, str(tag_id)))
+    
+    await db.commit()
+    bump_catalog_version()
+    return {"message": "Tag added successfully"}
 
 @router.delete("/{script_id}/tags/{tag_id}")
 async def remove_tag_from_script(
@@ -325,123 +499,102 @@ async def remove_tag_from_script(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Remove a tag from a script"""
-    # Get tag name
-    async with db.execute("SELECT name FROM tags WHERE id = ?", (tag_id,)) as cursor:
-        tag_row = await cursor.fetchone()
-        tag_name = tag_row[0] if tag_row else str(tag_id)
-    
     await db.execute(
         "DELETE FROM script_tags WHERE script_id = ? AND tag_id = ?",
         (script_id, tag_id)
     )
     
     # Log the change
-    await db.execute(
-        """
-        INSERT INTO change_log (script_id, change_type, old_value)
-        VALUES (?, 'tag_removed', ?)
-        """,
-        (script_id, tag_name)
-    )
+    cursor = await db.execute(LOG_TAG_REMOVED_SQL, (tag_id, str(tag_id), script_id))
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Script not found")
     
     await db.commit()
+    bump_catalog_version()
     return {"message": "Tag removed successfully"}
 
 @router.get("/duplicates/list")
-async def list_duplicates(db: aiosqlite.Connection = Depends(get_db)):
-    """Find and list duplicate scripts"""
-    query = """
-        SELECT hash, COUNT(*) as count, GROUP_CONCAT(path, '|') as paths,
-               GROUP_CONCAT(id, '|') as ids
-        FROM scripts
-        WHERE hash IS NOT NULL AND hash != '' AND missing_flag = 0
-        GROUP BY hash
-        HAVING count > 1
-        ORDER BY count DESC
-    """
-    
-    async with db.execute(query) as cursor:
-        rows = await cursor.fetchall()
-        duplicates = []
-        for row in rows:
-            duplicates.append({
+async def list_duplicates(
+    limit: int = Query(200, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: aiosqlite.Connection = Depends(get_read_db)
+):
+    """Find and list duplicate scripts, largest groups first, with the total group count"""
+    cache_key = ('duplicates', limit, offset)
+    cached = _get_cached_listing(cache_key)
+    if cached is not None:
+        return cached
+    version = catalog_version()
+    
+    async with db.execute(DUPLICATES_SQL, (limit, offset)) as cursor:
+        duplicates = [
+            {
                 'hash': row[0],
                 'count': row[1],
-                'paths': row[2].split('|') if row[2] else [],
-                'ids': [int(i) for i in row[3].split('|')] if row[3] else []
-            })
-        return duplicates
+                'paths': orjson.loads(row[2]),
+                'ids': orjson.loads(row[3])
+            }
+            for row in await cursor.fetchall()
+        ]
+    # The total lets clients tell a full page from a truncated listing
+    async with db.execute(DUPLICATE_GROUPS_COUNT_SQL) as cursor:
+        total = (await cursor.fetchone())[0]
+    result = {'items': duplicates, 'total': total, 'limit': limit, 'offset': offset}
+    _cache_listing(cache_key, version, result)
+    return result
 
 @router.get("/{script_id}/history")
-async def get_script_history(script_id: int, db: aiosqlite.Connection = Depends(get_db)):
-    """Get change history for a script"""
-    # Check if script exists
-    async with db.execute("SELECT id FROM scripts WHERE id = ?", (script_id,)) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Script not found")
-    
-    query = """
-        SELECT id, event_time, change_type, old_value, new_value, actor
-        FROM change_log
-        WHERE script_id = ?
-        ORDER BY event_time DESC
+async def get_script_history(
+    script_id: int,
+    limit: int = Query(200, ge=1, le=1000),
+    before: Optional[int] = None,
+    db: aiosqlite.Connection = Depends(get_read_db)
+):
+    """Get change history for a script, newest first
+
+    Pass the last returned entry's id as `before` to fetch older entries.
     """
-    
-    async with db.execute(query, (script_id,)) as cursor:
+    async with db.execute(HISTORY_SQL, (script_id, before, limit)) as cursor:
         rows = await cursor.fetchall()
-        history = []
-        for row in rows:
-            history.append({
-                'id': row[0],
-                'event_time': row[1],
-                'change_type': row[2],
-                'old_value': row[3],
-                'new_value': row[4],
-                'actor': row[5]
-            })
-        return history
+    if not rows:
+        raise HTTPException(status_code=404, detail="Script not found")
+    if rows[0][0] is None:
+        return []
+    return [dict(zip(HISTORY_COLUMNS, row)) for row in rows]
 
 @router.get("/{script_id}/content")
-async def get_script_content(script_id: int, db: aiosqlite.Connection = Depends(get_db)):
+async def get_script_content(script_id: int, db: aiosqlite.Connection = Depends(get_read_db)):
     """Get the actual file content of a script"""
-    # Get script path and validate it exists in database
-    async with db.execute(
-        "SELECT path, root_id FROM scripts WHERE id = ?",
-        (script_id,)
-    ) as cursor:
+    # Get script path and its root path, to validate the script is within a
+    # registered folder root
+    async with db.execute(SCRIPT_AND_ROOT_PATH_SQL, (script_id,)) as cursor:
         row = await cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Script not found")
-        file_path = row[0]
-        root_id = row[1]
-    
-    # Get root path to validate the script is within a registered folder root
-    async with db.execute(
-        "SELECT path FROM folder_roots WHERE id = ?",
-        (root_id,)
-    ) as cursor:
-        root_row = await cursor.fetchone()
-        if not root_row:
-            raise HTTPException(status_code=404, detail="Folder root not found")
-        root_path = root_row[0]
+    if not row:
+        raise HTTPException(status_code=404, detail="Script not found")
+    file_path, root_path = row
+    if root_path is None:
+        raise HTTPException(status_code=404, detail="Folder root not found")
     
     # Validate that the file path starts with the root path (security check)
     file_path_abs = os.path.abspath(file_path)
-    root_path_abs = os.path.abspath(root_path)
+    root_path_abs = _root_abspath(root_path)
     
-    try:
-        common_path = os.path.commonpath([file_path_abs, root_path_abs])
-    except ValueError:
-        raise HTTPException(status_code=403, detail="Access denied: invalid file path")
-
-    if common_path != root_path_abs:
+    # Both sides are normalized, so a prefix test ending at a separator is
+    # equivalent to comparing path components
+    root_prefix = root_path_abs if root_path_abs.endswith(os.sep) else root_path_abs + os.sep
+    if not file_path_abs.startswith(root_prefix):
         raise HTTPException(status_code=403, detail="Access denied: file is outside registered folder root")
     
-    # Read file content
+    # Read file content without blocking the event loop
     try:
-        with open(file_path_abs, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        file_size = (await aiofiles.os.stat(file_path_abs)).st_size
+        if file_size > SCRIPT_CONTENT_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="File is too large to display")
+        async with aiofiles.open(file_path_abs, 'r', encoding='utf-8', errors='ignore') as f:
+            content = await f.read()
         return {"content": content, "path": file_path}
+    except HTTPException:
+        raise
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found on disk")
     except Exception as e:
@@ -453,46 +606,53 @@ async def bulk_add_tags(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Add tags to multiple scripts"""
-    added_count = 0
-    skipped_count = 0
+    script_ids = orjson.dumps(request.script_ids).decode()
+    tag_ids = orjson.dumps(request.tag_ids).decode()
     
-    for script_id in request.script_ids:
-        # Verify script exists
-        async with db.execute("SELECT id FROM scripts WHERE id = ?", (script_id,)) as cursor:
-            if not await cursor.fetchone():
-                skipped_count += 1
-                continue
-        
-        for tag_id in request.tag_ids:
-            try:
-                # Get tag name for logging
-                async with db.execute("SELECT name FROM tags WHERE id = ?", (tag_id,)) as cursor:
-                    tag_row = await cursor.fetchone()
-                    tag_name = tag_row[0] if tag_row else str(tag_id)
-                
-                await db.execute(
-                    "INSERT INTO script_tags (script_id, tag_id) VALUES (?, ?)",
-                    (script_id, tag_id)
-                )
-                
-                # Log the change
-                await db.execute(
-                    """
-                    INSERT INTO change_log (script_id, change_type, new_value)
-                    VALUES (?, 'tag_added_bulk', ?)
-                    """,
-                    (script_id, tag_name)
-                )
-                added_count += 1
-            except aiosqlite.IntegrityError:
-                # Tag already exists, skip
-                skipped_count += 1
-                continue
+    async with db.execute(EXISTING_SCRIPT_IDS_SQL, (script_ids,)) as cursor:
+        valid_ids = {row[0] for row in await cursor.fetchall()}
+    # Get tag names for logging
+    async with db.execute(
+        "SELECT id, name FROM tags WHERE id IN (SELECT value FROM json_each(?))",
+        (tag_ids,)
+    ) as cursor:
+        tag_names = {row[0]: row[1] for row in await cursor.fetchall()}
+    
+    await db.execute("BEGIN IMMEDIATE")
+    # Existing pairs are ignored; RETURNING reports only the pairs added
+    async with db.execute(
+        """
+        INSERT OR IGNORE INTO script_tags (script_id, tag_id)
+        SELECT s.id, t.id FROM scripts s, tags t
+        WHERE s.id IN (SELECT value FROM json_each(?))
+          AND t.id IN (SELECT value FROM json_each(?))
+        RETURNING script_id, tag_id
+        """,
+        (script_ids, tag_ids)
+    ) as cursor:
+        added = await cursor.fetchall()
     
+    # Log the changes
+    await db.executemany(
+        """
+        INSERT INTO change_log (script_id, change_type, new_value)
+        VALUES (?, 'tag_added_bulk', ?)
+        """,
+        [(script_id, tag_names[tag_id]) for script_id, tag_id in added]
+    )
     await db.commit()
+    bump_catalog_version()
+    
+    # An unknown script is skipped once; a pair that was not added (unknown
+    # tag or already tagged) is skipped once per pair
+    requested = sum(1 for script_id in request.script_ids if script_id in valid_ids)
+    skipped_count = (
+        len(request.script_ids) - requested
+        + requested * len(request.tag_ids) - len(added)
+    )
     return {
         "message": "Bulk tag operation completed",
-        "added": added_count,
+        "added": len(added),
         "skipped": skipped_count
     }
 
@@ -502,153 +662,94 @@ async def bulk_update_status(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Update status for multiple scripts"""
-    updated_count = 0
+    script_ids = orjson.dumps(request.script_ids).decode()
+    async with db.execute(EXISTING_SCRIPT_IDS_SQL, (script_ids,)) as cursor:
+        valid_ids = [row[0] for row in await cursor.fetchall()]
     
-    for script_id in request.script_ids:
-        # Verify script exists
-        async with db.execute("SELECT id FROM scripts WHERE id = ?", (script_id,)) as cursor:
-            if not await cursor.fetchone():
-                continue
-        
-        # Check if status record exists
-        async with db.execute(
-            "SELECT script_id FROM script_status WHERE script_id = ?",
-            (script_id,)
-        ) as cursor:
-            exists = await cursor.fetchone()
-        
-        if exists:
-            # Update existing status
-            update_fields = []
-            params = []
-            
-            if request.status is not None:
-                update_fields.append("status = ?")
-                params.append(request.status)
-            if request.classification is not None:
-                update_fields.append("classification = ?")
-                params.append(request.classification)
-            if request.owner is not None:
-                update_fields.append("owner = ?")
-                params.append(request.owner)
-            if request.environment is not None:
-                update_fields.append("environment = ?")
-                params.append(request.environment)
-            
-            if update_fields:
-                update_fields.append("updated_at = CURRENT_TIMESTAMP")
-                params.append(script_id)
-                query = f"UPDATE script_status SET {', '.join(update_fields)} WHERE script_id = ?"
-                await db.execute(query, params)
-        else:
-            # Insert new status
-            await db.execute(
-                """
-                INSERT INTO script_status (script_id, status, classification, owner, environment)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (
-                    script_id,
-                    request.status or 'active',
-                    request.classification,
-                    request.owner,
-                    request.environment
-                )
-            )
-        
-        # Log the change
-        if request.status is not None:
-            await db.execute(
-                """
-                INSERT INTO change_log (script_id, change_type, new_value)
-                VALUES (?, 'status_changed_bulk', ?)
-                """,
-                (script_id, request.status)
-            )
-        
-        updated_count += 1
+    await db.execute("BEGIN IMMEDIATE")
+    await db.execute(
+        BULK_UPSERT_STATUS_SQL,
+        (request.status, request.classification, request.owner, request.environment, script_ids)
+    )
+    
+    # Log the change
+    if request.status is not None:
+        await db.executemany(
+            """
+            INSERT INTO change_log (script_id, change_type, new_value)
+            VALUES (?, 'status_changed_bulk', ?)
+            """,
+            [(script_id, request.status) for script_id in valid_ids]
+        )
     
     await db.commit()
+    bump_catalog_version()
+    valid = set(valid_ids)
     return {
         "message": "Bulk status update completed",
-        "updated": updated_count
+        "updated": sum(1 for script_id in request.script_ids if script_id in valid)
     }
 
 @router.post("/export")
 async def export_scripts(
     script_ids: List[int] = None,
-    db: aiosqlite.Connection = Depends(get_db)
+    db: aiosqlite.Connection = Depends(get_read_db)
 ):
     """Export script metadata as JSON"""
     # Build query based on whether specific script IDs are provided
     if script_ids:
         placeholders = ','.join('?' * len(script_ids))
-        query = f"""
-            SELECT id, root_id, folder_id, path, name, extension, language, 
-                   size, mtime, hash, line_count, missing_flag, created_at, updated_at
-            FROM scripts WHERE id IN ({placeholders})
-        """
+        query = f"{EXPORT_SCRIPTS_SQL} WHERE id IN ({placeholders})"
         params = script_ids
     else:
-        query = """
-            SELECT id, root_id, folder_id, path, name, extension, language,
-                   size, mtime, hash, line_count, missing_flag, created_at, updated_at
-            FROM scripts WHERE missing_flag = 0
-        """
+        query = f"{EXPORT_SCRIPTS_SQL} WHERE missing_flag = 0"
         params = ()
     
     exported_scripts = []
-    
+    scripts_by_id = {}
     async with db.execute(query, params) as cursor:
-        rows = await cursor.fetchall()
-        for row in rows:
-            script = dict(row)
-            script_id = script['id']
-            
-            # Get tags
-            async with db.execute(
-                """
-                SELECT t.name, t.group_name, t.color
-                FROM tags t
-                JOIN script_tags st ON t.id = st.tag_id
-                WHERE st.script_id = ?
-                """,
-                (script_id,)
-            ) as tag_cursor:
-                tags = [dict(tag_row) for tag_row in await tag_cursor.fetchall()]
-            script['tags'] = tags
-            
-            # Get status
-            async with db.execute(
-                "SELECT * FROM script_status WHERE script_id = ?",
-                (script_id,)
-            ) as status_cursor:
-                status_row = await status_cursor.fetchone()
-                script['status'] = dict(status_row) if status_row else None
-            
-            # Get notes
-            async with db.execute(
-                "SELECT content, updated_at FROM script_notes WHERE script_id = ? ORDER BY updated_at DESC",
-                (script_id,)
-            ) as notes_cursor:
-                notes = [dict(note_row) for note_row in await notes_cursor.fetchall()]
-            script['notes'] = notes
-            
-            # Get custom fields
-            async with db.execute(
-                "SELECT key, value FROM script_fields WHERE script_id = ?",
-                (script_id,)
-            ) as fields_cursor:
-                fields = {row[0]: row[1] for row in await fields_cursor.fetchall()}
-            script['custom_fields'] = fields
-            
+        for row in await cursor.fetchall():
+            script = dict(zip(EXPORT_COLUMNS, row))
+            script.update(tags=[], status=None, notes=[], custom_fields={})
             exported_scripts.append(script)
+            scripts_by_id[row[0]] = script
     
-    return {
-        "export_date": datetime.now().isoformat(),
+    # Load related rows a batch of scripts at a time rather than per script
+    ids = list(scripts_by_id)
+    for i in range(0, len(ids), EXPORT_BATCH_SIZE):
+        batch = ids[i:i + EXPORT_BATCH_SIZE]
+        batch += [None] * (EXPORT_BATCH_SIZE - len(batch))
+        
+        async with db.execute(EXPORT_TAGS_SQL, batch) as cursor:
+            for row in await cursor.fetchall():
+                scripts_by_id[row[0]]['tags'].append(
+                    {'name': row[1], 'group_name': row[2], 'color': row[3]}
+                )
+        
+        async with db.execute(EXPORT_STATUS_SQL, batch) as cursor:
+            columns = [column[0] for column in cursor.description]
+            for row in await cursor.fetchall():
+                scripts_by_id[row[0]]['status'] = dict(zip(columns, row))
+        
+        async with db.execute(EXPORT_NOTES_SQL, batch) as cursor:
+            for row in await cursor.fetchall():
+                scripts_by_id[row[0]]['notes'].append(
+                    {'content': row[1], 'updated_at': row[2]}
+                )
+        
+        async with db.execute(EXPORT_FIELDS_SQL, batch) as cursor:
+            for row in await cursor.fetchall():
+                scripts_by_id[row[0]]['custom_fields'][row[1]] = row[2]
+    
+    return ORJSONResponse({
+        "export_date": datetime.now(timezone.utc).isoformat(),
         "script_count": len(exported_scripts),
         "scripts": exported_scripts
-    }
+    })
+
+def _import_tag_name(tag_info: dict) -> Optional[str]:
+    """Normalise an imported tag name; JSON imports may carry non-string names"""
+    return str(tag_info.get('name') or '').strip() or None
 
 @router.post("/import")
 async def import_scripts(
@@ -669,19 +770,44 @@ async def import_scripts(
     
     scripts = data.get('scripts', [])
     
-    for script_data in scripts:
-        path = script_data.get('path')
+    # Match every imported path against the catalogue in one query
+    paths = [script_data.get('path') for script_data in scripts]
+    async with db.execute(
+        "SELECT path, id FROM scripts WHERE path IN (SELECT value FROM json_each(?))",
+        (orjson.dumps([path for path in paths if path]).decode(),)
+    ) as cursor:
+        script_ids_by_path = {row[0]: row[1] for row in await cursor.fetchall()}
+    
+    await db.execute("BEGIN IMMEDIATE")
+    
+    # Find or create every tag carried by a script that will be updated, up
+    # front; a tag's group and color come from its first occurrence
+    tag_infos = {}
+    if conflict_resolution != "skip":
+        for script_data, path in zip(scripts, paths):
+            if script_ids_by_path.get(path):
+                for tag_info in script_data.get('tags') or []:
+                    name = _import_tag_name(tag_info)
+                    if name:
+                        tag_infos.setdefault(name, tag_info)
+    tag_ids_by_name = {}
+    if tag_infos:
+        await db.executemany(
+            "INSERT INTO tags (name, group_name, color) VALUES (?, ?, ?) ON CONFLICT(name) DO NOTHING",
+            [(name, info.get('group_name'), info.get('color')) for name, info in tag_infos.items()]
+        )
+        async with db.execute(
+            "SELECT name, id FROM tags WHERE name IN (SELECT value FROM json_each(?))",
+            (orjson.dumps(list(tag_infos)).decode(),)
+        ) as cursor:
+            tag_ids_by_name = {row[0]: row[1] for row in await cursor.fetchall()}
+    
+    for script_data, path in zip(scripts, paths):
         if not path:
             skipped_count += 1
             continue
         
-        # Check if script exists
-        async with db.execute(
-            "SELECT id FROM scripts WHERE path = ?",
-            (path,)
-        ) as cursor:
-            existing_row = await cursor.fetchone()
-            existing_id = existing_row[0] if existing_row else None
+        existing_id = script_ids_by_path.get(path)
         
         if existing_id:
             if conflict_resolution == "skip":
@@ -690,42 +816,15 @@ async def import_scripts(
             
             # Handle tags
             if script_data.get('tags'):
-                if conflict_resolution == "merge":
-                    # Get existing tags
-                    async with db.execute(
-                        "SELECT tag_id FROM script_tags WHERE script_id = ?",
-                        (existing_id,)
-                    ) as cursor:
-                        existing_tag_ids = {row[0] for row in await cursor.fetchall()}
+                names = (_import_tag_name(tag_info) for tag_info in script_data['tags'])
+                tag_ids = [tag_ids_by_name[name] for name in names if name]
                 
-                for tag_info in script_data['tags']:
-                    tag_name = tag_info.get('name')
-                    if tag_name:
-                        # Find or create tag
-                        async with db.execute(
-                            "SELECT id FROM tags WHERE name = ?",
-                            (tag_name,)
-                        ) as cursor:
-                            tag_row = await cursor.fetchone()
-                            if tag_row:
-                                tag_id = tag_row[0]
-                            else:
-                                cursor = await db.execute(
-                                    "INSERT INTO tags (name, group_name, color) VALUES (?, ?, ?)",
-                                    (tag_name, tag_info.get('group_name'), tag_info.get('color'))
-                                )
-                                tag_id = cursor.lastrowid
-                        
-                        # Add tag to script if not exists
-                        if conflict_resolution == "overwrite" or tag_id not in existing_tag_ids:
-                            try:
-                                await db.execute(
-                                    "INSERT INTO script_tags (script_id, tag_id) VALUES (?, ?)",
-                                    (existing_id, tag_id)
-                                )
-                            except aiosqlite.IntegrityError:
-                                # Tag already exists for this script, skip
-                                pass
+                # Tags the script already has are left alone, for both
+                # overwrite and merge
+                await db.executemany(
+                    "INSERT OR IGNORE INTO script_tags (script_id, tag_id) VALUES (?, ?)",
+                    [(existing_id, tag_id) for tag_id in tag_ids]
+                )
             
             # Handle status
             if script_data.get('status') and conflict_resolution in ["overwrite", "merge"]:
@@ -747,14 +846,14 @@ async def import_scripts(
             
             # Handle notes
             if script_data.get('notes') and conflict_resolution == "merge":
-                for note_data in script_data['notes']:
-                    content = note_data.get('content')
-                    if content:
-                        is_markdown = 1 if note_data.get('is_markdown') else 0
-                        await db.execute(
-                            "INSERT INTO script_notes (script_id, content, is_markdown) VALUES (?, ?, ?)",
-                            (existing_id, content, is_markdown)
-                        )
+                await db.executemany(
+                    "INSERT INTO script_notes (script_id, content, is_markdown) VALUES (?, ?, ?)",
+                    [
+                        (existing_id, note_data['content'], 1 if note_data.get('is_markdown') else 0)
+                        for note_data in script_data['notes']
+                        if note_data.get('content')
+                    ]
+                )
             
             updated_count += 1
         else:
@@ -762,6 +861,7 @@ async def import_scripts(
             skipped_count += 1
     
     await db.commit()
+    bump_catalog_version()
     
     return {
         "message": "Import completed",
@@ -771,18 +871,13 @@ async def import_scripts(
     }
 
 @router.get("/{script_id}/fields")
-async def get_script_custom_fields(script_id: int, db: aiosqlite.Connection = Depends(get_db)):
+async def get_script_custom_fields(script_id: int, db: aiosqlite.Connection = Depends(get_read_db)):
     """Get all custom fields for a script"""
-    async with db.execute("SELECT id FROM scripts WHERE id = ?", (script_id,)) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Script not found")
-    
-    async with db.execute(
-        "SELECT key, value FROM script_fields WHERE script_id = ?",
-        (script_id,)
-    ) as cursor:
+    async with db.execute(CUSTOM_FIELDS_SQL, (script_id,)) as cursor:
         rows = await cursor.fetchall()
-        return {row[0]: row[1] for row in rows}
+    if not rows:
+        raise HTTPException(status_code=404, detail="Script not found")
+    return {row[0]: row[1] for row in rows if row[0] is not None}
 
 @router.put("/{script_id}/fields/{key}")
 async def set_script_custom_field(
@@ -792,21 +887,20 @@ async def set_script_custom_field(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Set a custom field for a script"""
-    async with db.execute("SELECT id FROM scripts WHERE id = ?", (script_id,)) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Script not found")
-    
     field_value = value.get('value', '')
     
-    # Insert or replace the field
-    await db.execute(
+    # Insert or replace the field; selecting from scripts writes nothing for
+    # an unknown script
+    cursor = await db.execute(
         """
         INSERT INTO script_fields (script_id, key, value)
-        VALUES (?, ?, ?)
+        SELECT id, ?, ? FROM scripts WHERE id = ?
         ON CONFLICT(script_id, key) DO UPDATE SET value = excluded.value
         """,
-        (script_id, key, field_value)
+        (key, field_value, script_id)
     )
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Script not found")
     
     # Log the change
     await db.execute(
@@ -827,21 +921,19 @@ async def delete_script_custom_field(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Delete a custom field from a script"""
-    async with db.execute("SELECT id FROM scripts WHERE id = ?", (script_id,)) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Script not found")
-    
-    await db.execute(
-        "DELETE FROM script_fields WHERE script_id = ? AND key = ?",
-        (script_id, key)
-    )
-    
-    # Log the change
-    await db.execute(
+    # Log the change; nothing is logged for an unknown script
+    cursor = await db.execute(
         """
         INSERT INTO change_log (script_id, change_type, old_value)
-        VALUES (?, 'custom_field_deleted', ?)
+        SELECT id, 'custom_field_deleted', ? FROM scripts WHERE id = ?
         """,
+        (key, script_id)
+    )
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Script not found")
+    
+    await db.execute(
+        "DELETE FROM script_fields WHERE script_id = ? AND key = ?",
         (script_id, key)
     )
     
@@ -2,21 +2,37 @@
 Search API endpoints
 """
 from fastapi import APIRouter, Depends
+from collections import defaultdict
 import aiosqlite
+import orjson
 
-from app.db.database import get_db
+from app.db.database import get_read_db
 from app.models.schemas import SearchRequest, PaginatedResponse
 
 router = APIRouter()
 
+# Columns of a search result row
+SEARCH_COLUMNS = ('id', 'name', 'path', 'extension', 'language', 'size', 'mtime', 'status')
+
+# Tag names for a page of results, from a JSON array of script ids
+SEARCH_PAGE_TAGS_SQL = """
+    SELECT sct.script_id, t.name
+    FROM script_tags sct
+    JOIN tags t ON t.id = sct.tag_id
+    WHERE sct.script_id IN (SELECT value FROM json_each(?))
+    ORDER BY t.name
+"""
+
 @router.post("/", response_model=PaginatedResponse)
 async def search_scripts(
     search: SearchRequest,
-    db: aiosqlite.Connection = Depends(get_db)
+    db: aiosqlite.Connection = Depends(get_read_db)
 ):
     """Advanced search for scripts"""
     conditions = ["s.missing_flag = 0"]
     params = []
+    # Set by every filter on script_status columns, so the count query joins it
+    needs_status_join = False
     
     # Query filter
     if search.query:
@@ -35,6 +51,7 @@ async def search_scripts(
         placeholders = ','.join('?' * len(search.status))
         conditions.append(f"st.status IN ({placeholders})")
         params.extend(search.status)
+        needs_status_join = True
     
     # Root ID filter
     if search.root_ids:
@@ -42,28 +59,33 @@ async def search_scripts(
         conditions.append(f"s.root_id IN ({placeholders})")
         params.extend(search.root_ids)
     
-    # Tags filter
+    # Tags filter: scripts carrying any of the tags
     if search.tags:
-        tag_conditions = []
-        for tag in search.tags:
-            tag_conditions.append("t.name = ?")
-            params.append(tag)
-        conditions.append(f"({' OR '.join(tag_conditions)})")
+        placeholders = ','.join('?' * len(search.tags))
+        conditions.append(f"""EXISTS (
+            SELECT 1 FROM script_tags sct
+            JOIN tags t ON t.id = sct.tag_id
+            WHERE sct.script_id = s.id AND t.name IN ({placeholders})
+        )""")
+        params.extend(search.tags)
     
     # Owner filter
     if search.owner:
         conditions.append("st.owner = ?")
         params.append(search.owner)
+        needs_status_join = True
     
     # Environment filter
     if search.environment:
         conditions.append("st.environment = ?")
         params.append(search.environment)
+        needs_status_join = True
     
     # Classification filter
     if search.classification:
         conditions.append("st.classification = ?")
         params.append(search.classification)
+        needs_status_join = True
     
     # Size range filters
     if search.min_size is not None:
@@ -101,42 +123,44 @@ async def search_scripts(
     
     where_clause = " AND ".join(conditions)
     
-    # Get total count
+    # Get total count; script_status has at most one row per script, so the
+    # join can't multiply rows and is only needed when filtering on it
+    status_join = "LEFT JOIN script_status st ON s.id = st.script_id" if needs_status_join else ""
     count_query = f"""
-        SELECT COUNT(DISTINCT s.id)
+        SELECT COUNT(*)
         FROM scripts s
-        LEFT JOIN script_status st ON s.id = st.script_id
-        LEFT JOIN script_tags sct ON s.id = sct.script_id
-        LEFT JOIN tags t ON sct.tag_id = t.id
+        {status_join}
         WHERE {where_clause}
     """
     async with db.execute(count_query, params) as cursor:
         total = (await cursor.fetchone())[0]
     
-    # Get paginated results
+    # Get paginated results; tags are fetched separately so the page query
+    # needs no join or GROUP BY over them
     offset = (search.page - 1) * search.page_size
     query = f"""
-        SELECT DISTINCT s.id, s.name, s.path, s.extension, s.language, 
-               s.size, s.mtime, st.status,
-               GROUP_CONCAT(DISTINCT t.name) as tags
+        SELECT s.id, s.name, s.path, s.extension, s.language,
+               s.size, s.mtime, st.status
         FROM scripts s
         LEFT JOIN script_status st ON s.id = st.script_id
-        LEFT JOIN script_tags sct ON s.id = sct.script_id
-        LEFT JOIN tags t ON sct.tag_id = t.id
         WHERE {where_clause}
-        GROUP BY s.id
         ORDER BY {sort_column} {sort_direction}, s.id ASC
         LIMIT ? OFFSET ?
     """
     params.extend([search.page_size, offset])
     
     async with db.execute(query, params) as cursor:
-        rows = await cursor.fetchall()
-        items = []
-        for row in rows:
-            item = dict(row)
-            item['tags'] = item['tags'].split(',') if item.get('tags') else []
-            items.append(item)
+        items = [dict(zip(SEARCH_COLUMNS, row)) for row in await cursor.fetchall()]
+    
+    if items:
+        tags_by_script = defaultdict(list)
+        async with db.execute(
+            SEARCH_PAGE_TAGS_SQL, (orjson.dumps([item['id'] for item in items]).decode(),)
+        ) as cursor:
+            for script_id, tag_name in await cursor.fetchall():
+                tags_by_script[script_id].append(tag_name)
+        for item in items:
+            item['tags'] = tags_by_script[item['id']]
     
     total_pages = (total + search.page_size - 1) // search.page_size
     
@@ -149,7 +173,7 @@ async def search_scripts(
     }
 
 @router.get("/stats")
-async def get_stats(db: aiosqlite.Connection = Depends(get_db)):
+async def get_stats(db: aiosqlite.Connection = Depends(get_read_db)):
     """Get statistics about scripts"""
     stats = {}
     
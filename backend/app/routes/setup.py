@@ -1,6 +1,7 @@
 """
 Setup Wizard API endpoints for first-time installation
 """
+import asyncio
 import json
 import os
 import tempfile
@@ -11,7 +12,7 @@ from typing import Optional
 
 import aiosqlite
 
-from app.db.database import get_db
+from app.db.database import get_db, bump_catalog_version
 
 router = APIRouter()
 
@@ -224,6 +225,8 @@ async def start_demo_mode(db: aiosqlite.Connection = Depends(get_db)):
     await _seed_demo_data(db)
     await _save_setting(db, "setup_completed", "true")
     await db.commit()
+    # Demo mode seeds scripts and tags
+    bump_catalog_version()
     return {"message": "Demo mode activated", "mode": "demo"}
 
 
@@ -282,7 +285,7 @@ async def complete_setup(
             existing = await cursor.fetchone()
 
         if not existing:
-            hashed = get_password_hash(config.admin.password)
+            hashed = await asyncio.to_thread(get_password_hash, config.admin.password)
             cur = await db.execute(
                 """INSERT INTO users
                    (username, email, full_name, hashed_password, is_active, is_superuser)
@@ -310,6 +313,9 @@ async def complete_setup(
 
     await _save_setting(db, "setup_completed", "true")
     await db.commit()
+    # Only demo mode seeds scripts and tags; other modes leave cached listings valid
+    if config.mode == "demo":
+        bump_catalog_version()
     return {
         "message": "Setup completed successfully",
         "mode": config.mode,
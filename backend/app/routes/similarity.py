@@ -5,7 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List
 import aiosqlite
 
-from app.db.database import get_db
+from app.db.database import get_read_db
 from app.services.similarity import find_similar_scripts, find_all_similar_groups, get_similarity_matrix
 
 router = APIRouter()
@@ -16,7 +16,7 @@ async def get_similar_scripts(
     script_id: int,
     threshold: float = Query(0.7, ge=0.0, le=1.0, description="Similarity threshold (0.0 to 1.0)"),
     limit: int = Query(10, ge=1, le=50, description="Maximum number of results"),
-    db: aiosqlite.Connection = Depends(get_db)
+    db: aiosqlite.Connection = Depends(get_read_db)
 ):
     """
     Find scripts similar to the given script
@@ -46,7 +46,7 @@ async def get_similar_scripts(
 async def get_similarity_groups(
     threshold: float = Query(0.8, ge=0.0, le=1.0, description="Similarity threshold"),
     min_group_size: int = Query(2, ge=2, le=10, description="Minimum scripts per group"),
-    db: aiosqlite.Connection = Depends(get_db)
+    db: aiosqlite.Connection = Depends(get_read_db)
 ):
     """
     Find all groups of similar scripts across the entire repository
@@ -72,7 +72,7 @@ async def get_similarity_groups(
 @router.post("/matrix")
 async def similarity_matrix(
     script_ids: List[int],
-    db: aiosqlite.Connection = Depends(get_db)
+    db: aiosqlite.Connection = Depends(get_read_db)
 ):
     """
     Generate a similarity matrix for a specific set of scripts
@@ -99,7 +99,7 @@ async def similarity_matrix(
 async def compare_two_scripts(
     script_id1: int,
     script_id2: int,
-    db: aiosqlite.Connection = Depends(get_db)
+    db: aiosqlite.Connection = Depends(get_read_db)
 ):
     """
     Compare two specific scripts and get their similarity score
@@ -5,17 +5,20 @@ from fastapi import APIRouter, Depends, HTTPException
 from typing import List
 import aiosqlite
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db, bump_catalog_version
 from app.models.schemas import TagCreate, TagResponse
 
 router = APIRouter()
 
+# Columns of a TagResponse
+TAG_COLUMNS = "id, name, group_name, color, created_at"
+
 @router.get("/", response_model=List[TagResponse])
-async def list_tags(db: aiosqlite.Connection = Depends(get_db)):
+async def list_tags(db: aiosqlite.Connection = Depends(get_read_db)):
     """List all tags"""
-    async with db.execute("SELECT * FROM tags ORDER BY name") as cursor:
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+    async with db.execute(f"SELECT {TAG_COLUMNS} FROM tags ORDER BY name") as cursor:
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in await cursor.fetchall()]
 
 @router.post("/", response_model=TagResponse)
 async def create_tag(tag: TagCreate, db: aiosqlite.Connection = Depends(get_db)):
@@ -28,7 +31,7 @@ async def create_tag(tag: TagCreate, db: aiosqlite.Connection = Depends(get_db))
         await db.commit()
         
         async with db.execute(
-            "SELECT * FROM tags WHERE id = ?",
+            f"SELECT {TAG_COLUMNS} FROM tags WHERE id = ?",
             (cursor.lastrowid,)
         ) as cursor:
             row = await cursor.fetchone()
@@ -37,9 +40,9 @@ async def create_tag(tag: TagCreate, db: aiosqlite.Connection = Depends(get_db))
         raise HTTPException(status_code=400, detail="Tag with this name already exists")
 
 @router.get("/{tag_id}", response_model=TagResponse)
-async def get_tag(tag_id: int, db: aiosqlite.Connection = Depends(get_db)):
+async def get_tag(tag_id: int, db: aiosqlite.Connection = Depends(get_read_db)):
     """Get a specific tag"""
-    async with db.execute("SELECT * FROM tags WHERE id = ?", (tag_id,)) as cursor:
+    async with db.execute(f"SELECT {TAG_COLUMNS} FROM tags WHERE id = ?", (tag_id,)) as cursor:
         row = await cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Tag not found")
@@ -48,31 +51,33 @@ async def get_tag(tag_id: int, db: aiosqlite.Connection = Depends(get_db)):
 @router.delete("/{tag_id}")
 async def delete_tag(tag_id: int, db: aiosqlite.Connection = Depends(get_db)):
     """Delete a tag"""
-    async with db.execute("SELECT * FROM tags WHERE id = ?", (tag_id,)) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Tag not found")
-    
-    await db.execute("DELETE FROM tags WHERE id = ?", (tag_id,))
+    async with db.execute("DELETE FROM tags WHERE id = ? RETURNING id", (tag_id,)) as cursor:
+        deleted = await cursor.fetchone()
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Tag not found")
     await db.commit()
+    bump_catalog_version()
     return {"message": "Tag deleted successfully"}
 
 @router.get("/{tag_id}/scripts")
 async def get_tag_scripts(
     tag_id: int,
-    db: aiosqlite.Connection = Depends(get_db)
+    db: aiosqlite.Connection = Depends(get_read_db)
 ):
     """Get all scripts with a specific tag"""
-    async with db.execute("SELECT * FROM tags WHERE id = ?", (tag_id,)) as cursor:
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Tag not found")
-    
+    # Joining from tags yields no rows for an unknown tag, and all-NULL
+    # script rows where the tag has no scripts or only missing ones
     query = """
         SELECT s.id, s.name, s.path, s.language
-        FROM scripts s
-        JOIN script_tags st ON s.id = st.script_id
-        WHERE st.tag_id = ? AND s.missing_flag = 0
+        FROM tags t
+        LEFT JOIN script_tags st ON st.tag_id = t.id
+        LEFT JOIN scripts s ON s.id = st.script_id AND s.missing_flag = 0
+        WHERE t.id = ?
         ORDER BY s.name
     """
     async with db.execute(query, (tag_id,)) as cursor:
+        columns = [column[0] for column in cursor.description]
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+    if not rows:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    return [dict(zip(columns, row)) for row in rows if row[0] is not None]
@@ -68,18 +68,16 @@ async def stop_watch_mode(
     db: aiosqlite.Connection = Depends(get_db)
 ):
     """Stop watching a folder root"""
-    # Verify root exists
-    async with db.execute(
-        "SELECT path FROM folder_roots WHERE id = ?",
-        (root_id,)
-    ) as cursor:
-        root = await cursor.fetchone()
-        if not root:
-            raise HTTPException(status_code=404, detail="Folder root not found")
-    
     watch_manager = get_watch_manager(DB_PATH)
     
     if not watch_manager.is_watching(root_id):
+        # Only a root that isn't watched needs checking; a watched one exists
+        async with db.execute(
+            "SELECT 1 FROM folder_roots WHERE id = ?",
+            (root_id,)
+        ) as cursor:
+            if not await cursor.fetchone():
+                raise HTTPException(status_code=404, detail="Folder root not found")
         return {
             "message": "Folder root is not being watched",
             "root_id": root_id
@@ -1,8 +1,14 @@
 """
 Full-Text Search (FTS5) service
 """
+import asyncio
 import aiosqlite
-from typing import Dict
+from typing import Dict, List
+
+# Maximum number of characters of each file stored in the index
+FTS_CONTENT_LIMIT = 100000
+# Content-indexed scripts read from disk and inserted per batch
+FTS_REBUILD_BATCH_SIZE = 1000
 
 
 async def index_script_content(db: aiosqlite.Connection, script_id: int, name: str, path: str, content: str = "", notes: str = ""):
@@ -80,40 +86,50 @@ async def search_fts(
     # Build FTS query - sanitize for FTS5 syntax
     # Wrap query in quotes to treat as phrase and escape special chars
     fts_query = query.replace('"', '""')  # Escape double quotes
-    # Wrap in quotes for phrase matching, which prevents FTS5 syntax injection
-    fts_query = f'"{fts_query}"'
+    # Wrap in quotes for phrase matching, which prevents FTS5 syntax injection,
+    # and restrict the phrase to the selected columns
+    fts_query = f'{{{" ".join(search_cols)}}} : "{fts_query}"'
     
-    # Count total results
-    count_query = f"""
-        SELECT COUNT(DISTINCT fts.script_id)
-        FROM scripts_fts fts
-        WHERE scripts_fts MATCH ?
-    """
-    async with db.execute(count_query, (fts_query,)) as cursor:
+    # Count total results (one FTS row per script)
+    async with db.execute(
+        "SELECT COUNT(*) FROM scripts_fts WHERE scripts_fts MATCH ?",
+        (fts_query,)
+    ) as cursor:
         total = (await cursor.fetchone())[0]
     
-    # Get paginated results with ranking
+    # Rank and paginate inside FTS5 first, then join metadata for the page only
     offset = (page - 1) * page_size
     search_query = """
-        SELECT DISTINCT 
-            fts.script_id,
+        WITH hits AS (
+            SELECT script_id,
+                   bm25(scripts_fts) AS rank,
+                   snippet(scripts_fts, -1, '**', '**', '…', 10) AS snippet
+            FROM scripts_fts
+            WHERE scripts_fts MATCH ?
+            ORDER BY rank
+            LIMIT ? OFFSET ?
+        )
+        SELECT 
+            h.script_id,
             s.name,
             s.path,
+            s.extension,
             s.language,
             s.size,
             s.mtime,
             st.status,
-            GROUP_CONCAT(DISTINCT t.name) as tags,
-            rank
-        FROM scripts_fts fts
-        JOIN scripts s ON fts.script_id = s.id
+            (
+                SELECT GROUP_CONCAT(t.name)
+                FROM script_tags sct
+                JOIN tags t ON sct.tag_id = t.id
+                WHERE sct.script_id = s.id
+            ) AS tags,
+            h.rank,
+            h.snippet
+        FROM hits h
+        JOIN scripts s ON h.script_id = s.id
         LEFT JOIN script_status st ON s.id = st.script_id
-        LEFT JOIN script_tags sct ON s.id = sct.script_id
-        LEFT JOIN tags t ON sct.tag_id = t.id
-        WHERE scripts_fts MATCH ?
-        GROUP BY fts.script_id
-        ORDER BY rank
-        LIMIT ? OFFSET ?
+        ORDER BY h.rank
     """
     
     async with db.execute(search_query, (fts_query, page_size, offset)) as cursor:
@@ -124,12 +140,14 @@ async def search_fts(
                 'id': row[0],
                 'name': row[1],
                 'path': row[2],
-                'language': row[3],
-                'size': row[4],
-                'mtime': row[5],
-                'status': row[6],
-                'tags': row[7].split(',') if row[7] else [],
-                'rank': row[8]
+                'extension': row[3],
+                'language': row[4],
+                'size': row[5],
+                'mtime': row[6],
+                'status': row[7],
+                'tags': row[8].split(',') if row[8] else [],
+                'rank': row[9],
+                'snippet': row[10]
             }
             items.append(item)
     
@@ -144,6 +162,20 @@ async def search_fts(
     }
 
 
+def _read_contents(paths: List[str]) -> List[str]:
+    """Read the indexed prefix of each file, using an empty string when unreadable"""
+    contents = []
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                contents.append(f.read(FTS_CONTENT_LIMIT))
+        except Exception:
+            # Intentionally ignore any errors while reading file content;
+            # the script will still be indexed using metadata and notes only.
+            contents.append("")
+    return contents
+
+
 async def rebuild_fts_index(db: aiosqlite.Connection, root_id: int = None):
     """Rebuild the FTS index for all scripts or a specific root"""
     # Clear FTS table
@@ -157,58 +189,46 @@ async def rebuild_fts_index(db: aiosqlite.Connection, root_id: int = None):
         # Clear all
         await db.execute("DELETE FROM scripts_fts")
     
-    # Get scripts to index
-    if root_id:
-        query = "SELECT id, name, path FROM scripts WHERE root_id = ? AND missing_flag = 0"
-        params = (root_id,)
-    else:
-        query = "SELECT id, name, path FROM scripts WHERE missing_flag = 0"
-        params = ()
+    # Scripts to index, with their notes concatenated in SQL. A NULL flag (or a
+    # missing root) means no content indexing, so every script lands in one pass
+    root_filter = "AND s.root_id = ?" if root_id else ""
+    params = (root_id,) if root_id else ()
+    scripts_query = f"""
+        SELECT s.id, s.name, s.path,
+               COALESCE((
+                   SELECT GROUP_CONCAT(n.content, ' ')
+                   FROM script_notes n
+                   WHERE n.script_id = s.id
+               ), '') AS notes
+        FROM scripts s
+        LEFT JOIN folder_roots fr ON fr.id = s.root_id
+        WHERE s.missing_flag = 0 {root_filter}
+          AND COALESCE(fr.enable_content_indexing, 0) {{content_indexing}}
+    """
     
-    async with db.execute(query, params) as cursor:
-        scripts = await cursor.fetchall()
+    # Roots without content indexing need nothing from disk: index them in one statement
+    cursor = await db.execute(
+        "INSERT INTO scripts_fts (script_id, name, path, content, notes) "
+        f"SELECT id, name, path, '', notes FROM ({scripts_query.format(content_indexing='= 0')})",
+        params
+    )
+    indexed_count = cursor.rowcount
     
-    indexed_count = 0
-    for script in scripts:
-        script_id, name, path = script
-        
-        # Get notes
-        async with db.execute(
-            "SELECT GROUP_CONCAT(content, ' ') FROM script_notes WHERE script_id = ?",
-            (script_id,)
-        ) as cursor:
-            notes_row = await cursor.fetchone()
-            notes = notes_row[0] if notes_row and notes_row[0] else ""
-        
-        # Read content if file exists (only for indexed roots)
-        content = ""
-        try:
-            # Check if content indexing is enabled for this root
-            async with db.execute(
-                """
-                SELECT fr.enable_content_indexing 
-                FROM folder_roots fr 
-                JOIN scripts s ON fr.id = s.root_id 
-                WHERE s.id = ?
-                """,
-                (script_id,)
-            ) as cursor:
-                root_row = await cursor.fetchone()
-                if root_row and root_row[0]:
-                    # Read file content
-                    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read(100000)  # Limit to first 100KB
-        except Exception:
-            # Intentionally ignore any errors while reading file content;
-            # the script will still be indexed using metadata and notes only.
-            pass
-        
-        # Index in FTS
-        await db.execute(
-            "INSERT INTO scripts_fts (script_id, name, path, content, notes) VALUES (?, ?, ?, ?, ?)",
-            (script_id, name, path, content, notes)
-        )
-        indexed_count += 1
+    # Content-indexed roots: read files off the event loop and insert in batches
+    async with db.execute(scripts_query.format(content_indexing='!= 0'), params) as cursor:
+        while True:
+            rows = await cursor.fetchmany(FTS_REBUILD_BATCH_SIZE)
+            if not rows:
+                break
+            contents = await asyncio.to_thread(_read_contents, [row[2] for row in rows])
+            await db.executemany(
+                "INSERT INTO scripts_fts (script_id, name, path, content, notes) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (script_id, name, path, content, notes)
+                    for (script_id, name, path, notes), content in zip(rows, contents)
+                ]
+            )
+            indexed_count += len(rows)
     
     await db.commit()
     return indexed_count
@@ -1,8 +1,11 @@
 """
 Markdown rendering service
 """
+import threading
+
 import markdown
 import bleach
+from bleach.linkifier import Linker
 from pymdownx import emoji, superfences
 
 
@@ -23,6 +26,76 @@ ALLOWED_ATTRIBUTES = {
 }
 
 
+# Markdown and bleach objects are costly to build but not thread-safe, so
+# each thread builds its own once and reuses it
+_local = threading.local()
+
+MARKDOWN_EXTENSIONS = [
+    'markdown.extensions.fenced_code',
+    'markdown.extensions.tables',
+    'markdown.extensions.nl2br',
+    'markdown.extensions.sane_lists',
+    'markdown.extensions.toc',
+    'pymdownx.superfences',
+    'pymdownx.tasklist',
+    'pymdownx.emoji',
+    'pymdownx.highlight',
+    'pymdownx.inlinehilite',
+    'pymdownx.magiclink'
+]
+
+MARKDOWN_EXTENSION_CONFIGS = {
+    'pymdownx.tasklist': {
+        'custom_checkbox': True
+    },
+    'pymdownx.emoji': {
+        'emoji_index': emoji.twemoji,
+        'emoji_generator': emoji.to_svg
+    },
+    'pymdownx.superfences': {
+        'custom_fences': [
+            {
+                'name': 'mermaid',
+                'class': 'mermaid',
+                'format': superfences.fence_code_format
+            }
+        ]
+    }
+}
+
+
+def _get_markdown() -> markdown.Markdown:
+    """Get this thread's Markdown processor, reset for a new document"""
+    md = getattr(_local, 'md', None)
+    if md is None:
+        md = _local.md = markdown.Markdown(
+            extensions=MARKDOWN_EXTENSIONS,
+            extension_configs=MARKDOWN_EXTENSION_CONFIGS,
+            output_format='html5'
+        )
+    return md.reset()
+
+
+def _get_cleaner() -> bleach.Cleaner:
+    """Get this thread's bleach Cleaner"""
+    cleaner = getattr(_local, 'cleaner', None)
+    if cleaner is None:
+        cleaner = _local.cleaner = bleach.Cleaner(
+            tags=ALLOWED_TAGS,
+            attributes=ALLOWED_ATTRIBUTES,
+            strip=True
+        )
+    return cleaner
+
+
+def _get_linker() -> Linker:
+    """Get this thread's bleach Linker"""
+    linker = getattr(_local, 'linker', None)
+    if linker is None:
+        linker = _local.linker = Linker()
+    return linker
+
+
 def render_markdown(content: str, safe: bool = True) -> str:
     """
     Render markdown content to HTML
@@ -34,60 +107,13 @@ def render_markdown(content: str, safe: bool = True) -> str:
     Returns:
         Rendered HTML string
     """
-    # Configure extensions
-    extensions = [
-        'markdown.extensions.fenced_code',
-        'markdown.extensions.tables',
-        'markdown.extensions.nl2br',
-        'markdown.extensions.sane_lists',
-        'markdown.extensions.toc',
-        'pymdownx.superfences',
-        'pymdownx.tasklist',
-        'pymdownx.emoji',
-        'pymdownx.highlight',
-        'pymdownx.inlinehilite',
-        'pymdownx.magiclink'
-    ]
-    
-    # Configure extension settings
-    extension_configs = {
-        'pymdownx.tasklist': {
-            'custom_checkbox': True
-        },
-        'pymdownx.emoji': {
-            'emoji_index': emoji.twemoji,
-            'emoji_generator': emoji.to_svg
-        },
-        'pymdownx.superfences': {
-            'custom_fences': [
-                {
-                    'name': 'mermaid',
-                    'class': 'mermaid',
-                    'format': superfences.fence_code_format
-                }
-            ]
-        }
-    }
-    
-    # Render markdown
-    md = markdown.Markdown(
-        extensions=extensions,
-        extension_configs=extension_configs,
-        output_format='html5'
-    )
-    
-    html = md.convert(content)
+    html = _get_markdown().convert(content)
     
     # Sanitize HTML using bleach for production-grade XSS protection
     if safe:
-        html = bleach.clean(
-            html,
-            tags=ALLOWED_TAGS,
-            attributes=ALLOWED_ATTRIBUTES,
-            strip=True
-        )
+        html = _get_cleaner().clean(html)
         # Also linkify URLs
-        html = bleach.linkify(html)
+        html = _get_linker().linkify(html)
     
     return html
 
@@ -2,12 +2,25 @@
 Script scanning and indexing service
 """
 import os
+import asyncio
 import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 import fnmatch
 
+# Worker processes used to hash scanned files (0 = one per CPU)
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "0")) or None
+# Files handed to a worker per task, to amortize pickling overhead
+SCAN_HASH_CHUNK_SIZE = 64
+# Files walked, hashed and written per batch, bounding scan memory
+SCAN_BATCH_SIZE = 1000
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
 # Language detection based on extensions
 EXTENSION_LANGUAGE_MAP = {
     '.py': 'Python',
@@ -37,15 +50,17 @@ EXTENSION_LANGUAGE_MAP = {
 
 def get_file_hash(file_path: str) -> str:
     """Calculate SHA256 hash of file content"""
-    sha256_hash = hashlib.sha256()
     try:
         with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+            # file_digest reads into one reusable buffer and hashes it in C
+            return hashlib.file_digest(f, "sha256").hexdigest()
     except Exception:
         return ""
 
+def format_mtime(timestamp: float) -> str:
+    """Format a file modification time as the canonical stored string (second precision)"""
+    return datetime.fromtimestamp(timestamp).replace(microsecond=0).isoformat(sep=' ')
+
 def get_line_count(file_path: str) -> int:
     """Count lines in a text file"""
     try:
@@ -54,6 +69,28 @@ def get_line_count(file_path: str) -> int:
     except Exception:
         return 0
 
+def hash_and_count_files(paths: List[str]) -> List[Tuple[str, int]]:
+    """Hash and count lines for a batch of files (runs in a worker process)"""
+    return [(get_file_hash(path), get_line_count(path)) for path in paths]
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared hashing process pool, creating it on first use"""
+    global _process_pool
+    if _process_pool is None:
+        # spawn rather than fork: the server process already runs threads
+        _process_pool = ProcessPoolExecutor(
+            max_workers=SCAN_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+def shutdown_process_pool():
+    """Shut down the shared hashing process pool"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
 def detect_language(file_path: str) -> Optional[str]:
     """Detect script language based on extension"""
     ext = Path(file_path).suffix.lower()
@@ -77,27 +114,15 @@ def match_patterns(path: str, patterns: Optional[str]) -> bool:
             return True
     return False
 
-async def scan_directory(
-    root_path: str,
-    recursive: bool = True,
-    include_patterns: Optional[str] = None,
-    exclude_patterns: Optional[str] = None,
-    follow_symlinks: bool = False,
-    max_file_size: int = 10485760
-) -> List[Dict]:
-    """
-    Scan directory for script files
-    Returns list of file metadata dictionaries
-    """
-    scripts = []
-    root_path_obj = Path(root_path)
-    
-    if not root_path_obj.exists():
-        raise ValueError(f"Path does not exist: {root_path}")
-    
-    if not root_path_obj.is_dir():
-        raise ValueError(f"Path is not a directory: {root_path}")
-    
+def _walk_scripts(
+    root_path: Path,
+    recursive: bool,
+    include_patterns: Optional[str],
+    exclude_patterns: Optional[str],
+    follow_symlinks: bool,
+    max_file_size: int
+) -> Iterator[Dict]:
+    """Lazily walk a directory, yielding metadata for each matching script file"""
     def scan_path(path: Path):
         try:
             for item in path.iterdir():
@@ -112,7 +137,7 @@ async def scan_directory(
                 # Recursively scan directories
                 if item.is_dir():
                     if recursive:
-                        scan_path(item)
+                        yield from scan_path(item)
                     continue
                 
                 # Process files
@@ -133,29 +158,77 @@ async def scan_directory(
                     except Exception:
                         continue
                     
-                    # Get file metadata
+                    # Get file metadata (content is hashed afterwards)
                     try:
                         stat = item.stat()
-                        scripts.append({
+                        script = {
                             'path': str(item.absolute()),
                             'name': item.name,
                             'extension': item.suffix.lower(),
                             'language': detect_language(str(item)),
                             'size': stat.st_size,
-                            'mtime': datetime.fromtimestamp(stat.st_mtime),
-                            'hash': get_file_hash(str(item)),
-                            'line_count': get_line_count(str(item))
-                        })
+                            'mtime': format_mtime(stat.st_mtime)
+                        }
                     except Exception as e:
                         print(f"Error processing file {item}: {e}")
                         continue
+                    yield script
         except PermissionError:
             print(f"Permission denied: {path}")
         except Exception as e:
             print(f"Error scanning {path}: {e}")
     
-    scan_path(root_path_obj)
-    return scripts
+    yield from scan_path(root_path)
+
+async def iter_script_batches(
+    root_path: str,
+    recursive: bool = True,
+    include_patterns: Optional[str] = None,
+    exclude_patterns: Optional[str] = None,
+    follow_symlinks: bool = False,
+    max_file_size: int = 10485760
+) -> AsyncIterator[List[Dict]]:
+    """
+    Walk directory for script files
+    Yields batches of file metadata dictionaries, without content hashes
+    """
+    root_path_obj = Path(root_path)
+    
+    if not root_path_obj.exists():
+        raise ValueError(f"Path does not exist: {root_path}")
+    
+    if not root_path_obj.is_dir():
+        raise ValueError(f"Path is not a directory: {root_path}")
+    
+    files = _walk_scripts(
+        root_path_obj, recursive, include_patterns, exclude_patterns,
+        follow_symlinks, max_file_size
+    )
+    while True:
+        # Advance the walk off the event loop, one batch at a time
+        batch = await asyncio.to_thread(lambda: list(islice(files, SCAN_BATCH_SIZE)))
+        if not batch:
+            break
+        yield batch
+
+async def hash_scripts(scripts: List[Dict]):
+    """Fill in hash and line_count for scanned scripts, using worker processes"""
+    paths = [script['path'] for script in scripts]
+    if len(paths) <= SCAN_HASH_CHUNK_SIZE:
+        # Not worth a round trip through the process pool
+        results = [await asyncio.to_thread(hash_and_count_files, paths)]
+    else:
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, hash_and_count_files, paths[i:i + SCAN_HASH_CHUNK_SIZE])
+            for i in range(0, len(paths), SCAN_HASH_CHUNK_SIZE)
+        ))
+    
+    content = (item for chunk in results for item in chunk)
+    for script, (file_hash, line_count) in zip(scripts, content):
+        script['hash'] = file_hash
+        script['line_count'] = line_count
 
 async def get_duplicate_scripts(db) -> List[Dict]:
     """Find scripts with duplicate content hashes"""
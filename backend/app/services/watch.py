@@ -8,9 +8,9 @@ from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from typing import Dict
 import aiosqlite
-from datetime import datetime
 
-from app.services.scanner import is_script_file, get_file_hash, get_line_count, detect_language
+from app.db.database import configure_connection, bump_catalog_version
+from app.services.scanner import is_script_file, get_file_hash, get_line_count, detect_language, format_mtime
 
 
 class ScriptFileHandler(FileSystemEventHandler):
@@ -115,13 +115,14 @@ class ScriptFileHandler(FileSystemEventHandler):
                 'extension': path_obj.suffix.lower(),
                 'language': detect_language(file_path),
                 'size': stat.st_size,
-                'mtime': datetime.fromtimestamp(stat.st_mtime),
+                'mtime': format_mtime(stat.st_mtime),
                 'hash': get_file_hash(file_path),
                 'line_count': get_line_count(file_path)
             }
             
             # Update database
             async with aiosqlite.connect(self.db_path) as db:
+                await configure_connection(db)
                 # Check if script exists
                 async with db.execute(
                     "SELECT id FROM scripts WHERE path = ?",
@@ -163,6 +164,7 @@ class ScriptFileHandler(FileSystemEventHandler):
                     print(f"Watch: Inserted new script in DB: {file_path}")
                 
                 await db.commit()
+                bump_catalog_version()
         
         except Exception as e:
             print(f"Watch: Error updating file {file_path}: {e}")
@@ -171,11 +173,13 @@ class ScriptFileHandler(FileSystemEventHandler):
         """Mark file as missing in database"""
         try:
             async with aiosqlite.connect(self.db_path) as db:
+                await configure_connection(db)
                 await db.execute(
                     "UPDATE scripts SET missing_flag = 1 WHERE path = ?",
                     (file_path,)
                 )
                 await db.commit()
+                bump_catalog_version()
                 print(f"Watch: Marked file as missing: {file_path}")
         except Exception as e:
             print(f"Watch: Error marking file missing {file_path}: {e}")
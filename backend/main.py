@@ -5,9 +5,11 @@ Main entry point for the FastAPI application
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
-from app.db.database import init_db
+from app.db.database import init_db, get_pool, get_read_pool, close_pool, warm_db, WARMUP_DB
+from app.services.scanner import shutdown_process_pool
 from app.routes import folder_roots, scripts, tags, notes, search, folders, saved_searches, fts, watch, similarity, attachments, auth, setup, monitors, schedules, notifications
 from app.utils.logging_config import setup_logging, get_logger
 
@@ -35,6 +37,10 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Script Manager API...")
     await init_db()
+    get_pool()
+    get_read_pool()
+    if WARMUP_DB:
+        await warm_db()
 
     # Initialize auth system
     from app.db.database import DB_PATH
@@ -59,6 +65,9 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down Script Manager API...")
+    await folder_roots.close_scan_writer()
+    shutdown_process_pool()
+    await close_pool()
 
 
 # Get allowed origins from environment variable
@@ -71,7 +80,8 @@ app = FastAPI(
     title="Script Manager API",
     description="API for managing script file collections",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for frontend
@@ -20,6 +20,7 @@ import app.db.database as _db_mod
 import app.routes.schedules as _sched_mod
 import app.routes.folder_roots as _fr_mod
 import app.routes.watch as _watch_mod
+import app.routes.auth as _auth_mod
 from main import app as _app
 
 # All modules that carry their own DB_PATH reference alongside _db_mod
@@ -40,6 +41,8 @@ async def app():
         mod.DB_PATH = db_path
 
     await _db_mod.init_db()
+    # Cached users belong to the previous test's database
+    _auth_mod.clear_user_cache()
 
     # Seed default roles into the test database
     from app.services.auth import init_default_roles
@@ -47,24 +50,37 @@ async def app():
         db.row_factory = aiosqlite.Row
         await init_default_roles(db)
 
-    # Override get_db to always use our temp database
+    # Override get_db and get_read_db to always use our temp database,
+    # configured the same way as pooled connections
     async def _override_get_db():
         async with aiosqlite.connect(db_path) as db:
+            await _db_mod.configure_connection(db)
             db.row_factory = aiosqlite.Row
             yield db
 
-    # Snapshot and restore only the specific override we add so we don't
+    async def _override_get_read_db():
+        async with aiosqlite.connect(f"file:{db_path}?mode=ro", uri=True) as db:
+            await _db_mod.configure_connection(db)
+            db.row_factory = aiosqlite.Row
+            yield db
+
+    # Snapshot and restore only the specific overrides we add so we don't
     # disturb any other overrides that might be registered on the shared app.
-    _prior_override = _app.dependency_overrides.get(_db_mod.get_db)
-    _app.dependency_overrides[_db_mod.get_db] = _override_get_db
+    overrides = {_db_mod.get_db: _override_get_db, _db_mod.get_read_db: _override_get_read_db}
+    _prior_overrides = {dep: _app.dependency_overrides.get(dep) for dep in overrides}
+    _app.dependency_overrides.update(overrides)
 
     yield _app
 
-    # Restore the get_db override to exactly what it was before this fixture
-    if _prior_override is None:
-        _app.dependency_overrides.pop(_db_mod.get_db, None)
-    else:
-        _app.dependency_overrides[_db_mod.get_db] = _prior_override
+    # Restore the overrides to exactly what they were before this fixture
+    for dep, prior in _prior_overrides.items():
+        if prior is None:
+            _app.dependency_overrides.pop(dep, None)
+        else:
+            _app.dependency_overrides[dep] = prior
+
+    # The shared scan writer is bound to this test's database
+    await _fr_mod.close_scan_writer()
 
     # Restore DB_PATH in all patched modules
     _db_mod.DB_PATH = original_db_path
@@ -72,6 +88,10 @@ async def app():
         mod.DB_PATH = original_db_path
 
     os.unlink(db_path)
+    # WAL mode leaves -wal/-shm side files next to the database
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
 
 
 @pytest_asyncio.fixture
@@ -0,0 +1,138 @@
+"""
+Tests for the Attachments API endpoints.
+"""
+import hashlib
+
+import pytest
+
+import app.routes.attachments as _attachments_mod
+
+
+@pytest.fixture(autouse=True)
+def attachments_dir(tmp_path, monkeypatch):
+    """Store uploaded files in a per-test directory."""
+    target = tmp_path / "attachments"
+    target.mkdir()
+    monkeypatch.setattr(_attachments_mod, "ATTACHMENTS_DIR", str(target))
+    return target
+
+
+async def _create_script(client, tmp_path):
+    """Register a folder root containing one script, scan it and return the script id."""
+    root = tmp_path / "scripts"
+    root.mkdir()
+    (root / "hello.py").write_text("print('hello')\n")
+    create = await client.post(
+        "/api/folder-roots/", json={"path": str(root), "name": "Attach Root"}
+    )
+    root_id = create.json()["id"]
+    await client.post(f"/api/folder-roots/{root_id}/scan", json={})
+    resp = await client.get("/api/scripts/", params={"root_id": root_id})
+    return resp.json()["items"][0]["id"]
+
+
+@pytest.mark.asyncio
+async def test_upload_requires_target(client):
+    """Uploading without a script_id or note_id should return 400."""
+    resp = await client.post(
+        "/api/attachments/upload", files={"file": ("a.txt", b"data", "text/plain")}
+    )
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_upload_and_download(client, tmp_path, attachments_dir):
+    """An uploaded file should be stored on disk and downloadable."""
+    script_id = await _create_script(client, tmp_path)
+    payload = b"line one\nline two\n" * 1000
+    resp = await client.post(
+        "/api/attachments/upload",
+        params={"script_id": script_id},
+        files={"file": ("notes.txt", payload, "text/plain")},
+    )
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["original_filename"] == "notes.txt"
+    assert data["file_size"] == len(payload)
+    assert data["mime_type"] == "text/plain"
+    assert data["hash"] == hashlib.sha256(payload).hexdigest()
+
+    assert "T" in data["created_at"]
+
+    listing = await client.get(f"/api/attachments/script/{script_id}")
+    assert listing.json() == [data]
+
+    detail = await client.get(f"/api/attachments/{data['id']}")
+    assert detail.json() == data
+
+    download = await client.get(f"/api/attachments/{data['id']}/download")
+    assert download.status_code == 200
+    assert download.content == payload
+
+
+@pytest.mark.asyncio
+async def test_upload_guesses_compound_mime_type(client, tmp_path):
+    """Types the extension map misses fall back to mimetypes.guess_type."""
+    script_id = await _create_script(client, tmp_path)
+    resp = await client.post(
+        "/api/attachments/upload",
+        params={"script_id": script_id},
+        files={"file": ("backup.tbz2", b"data", "application/octet-stream")},
+    )
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["mime_type"] == "application/x-tar"
+
+
+@pytest.mark.asyncio
+async def test_upload_too_large(client, tmp_path, attachments_dir, monkeypatch):
+    """Oversized uploads should return 413 and leave no file behind."""
+    script_id = await _create_script(client, tmp_path)
+    monkeypatch.setattr(_attachments_mod, "MAX_ATTACHMENT_SIZE", 1024)
+    monkeypatch.setattr(_attachments_mod, "UPLOAD_CHUNK_SIZE", 256)
+    resp = await client.post(
+        "/api/attachments/upload",
+        params={"script_id": script_id},
+        files={"file": ("big.bin", b"x" * 4096, "application/octet-stream")},
+    )
+    assert resp.status_code == 413
+    assert list(attachments_dir.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_upload_failure_removes_partial_file(client, tmp_path, attachments_dir, monkeypatch):
+    """An upload that fails partway through should leave no file behind."""
+    from starlette.datastructures import UploadFile
+
+    script_id = await _create_script(client, tmp_path)
+    monkeypatch.setattr(_attachments_mod, "UPLOAD_CHUNK_SIZE", 256)
+    read = UploadFile.read
+    calls = 0
+
+    async def _failing_read(self, size=-1):
+        nonlocal calls
+        calls += 1
+        if calls > 2:
+            raise OSError("connection lost")
+        return await read(self, size)
+
+    monkeypatch.setattr(UploadFile, "read", _failing_read)
+    with pytest.raises(OSError):
+        await client.post(
+            "/api/attachments/upload",
+            params={"script_id": script_id},
+            files={"file": ("big.bin", b"x" * 4096, "application/octet-stream")},
+        )
+    assert list(attachments_dir.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_upload_unknown_note(client, tmp_path):
+    """Uploading against a missing note should return 404 even if the script exists."""
+    script_id = await _create_script(client, tmp_path)
+    resp = await client.post(
+        "/api/attachments/upload",
+        params={"script_id": script_id, "note_id": 9999},
+        files={"file": ("a.txt", b"data", "text/plain")},
+    )
+    assert resp.status_code == 404
+    assert resp.json()["detail"] == "Note not found"
@@ -71,3 +71,59 @@ async def test_list_users(auth_client):
     assert resp.status_code == 200
     users = resp.json()
     assert any(u["username"] == "testadmin" for u in users)
+
+
+@pytest.mark.asyncio
+async def test_register_assigns_viewer_role(client):
+    """A self-registered user should be able to log in with viewer permissions."""
+    resp = await client.post(
+        "/api/auth/register",
+        json={"username": "newuser", "email": "new@example.com", "password": "NewPass123"},
+    )
+    assert resp.status_code == 200, resp.text
+    assert isinstance(resp.json()["user_id"], int)
+
+    login = await client.post(
+        "/api/auth/login", data={"username": "newuser", "password": "NewPass123"}
+    )
+    assert login.status_code == 200
+    token = login.json()["access_token"]
+    me = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.status_code == 200
+    assert "scripts.read" in me.json()["permissions"]
+
+
+@pytest.mark.asyncio
+async def test_deactivated_user_rejected_immediately(auth_client):
+    """Deactivating a user must take effect despite the cached user lookup."""
+    reg = await auth_client.post(
+        "/api/auth/register",
+        json={"username": "shortlived", "email": "short@example.com", "password": "ShortPass123"},
+    )
+    user_id = reg.json()["user_id"]
+    login = await auth_client.post(
+        "/api/auth/login", data={"username": "shortlived", "password": "ShortPass123"}
+    )
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    assert (await auth_client.get("/api/auth/me", headers=headers)).status_code == 200
+
+    resp = await auth_client.put(f"/api/auth/users/{user_id}", json={"is_active": False})
+    assert resp.status_code == 200
+    assert (await auth_client.get("/api/auth/me", headers=headers)).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_register_duplicate_username_and_email(client):
+    """Registering a taken username or email should return 400 with the right reason."""
+    payload = {"username": "dupe", "email": "dupe@example.com", "password": "DupePass123"}
+    assert (await client.post("/api/auth/register", json=payload)).status_code == 200
+
+    resp = await client.post(
+        "/api/auth/register", json={**payload, "email": "other@example.com"}
+    )
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Username already exists"
+
+    resp = await client.post("/api/auth/register", json={**payload, "username": "other"})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Email already exists"
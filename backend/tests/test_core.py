@@ -1,6 +1,9 @@
 """
 Tests for Tags, Folder Roots, and core Script operations.
 """
+import base64
+import json
+
 import pytest
 
 
@@ -54,6 +57,44 @@ async def test_delete_tag(client):
     assert "deleted" in resp.json().get("message", "").lower()
 
 
+@pytest.mark.asyncio
+async def test_tag_not_found(client):
+    """Deleting or listing scripts for an unknown tag should return 404."""
+    assert (await client.delete("/api/tags/99999")).status_code == 404
+    assert (await client.get("/api/tags/99999/scripts")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_tag_scripts(client, tmp_path):
+    """A tag lists its present scripts by name, and an unused tag lists none."""
+    scripts = await _scan_scripts(client, tmp_path, ("b.py", "a.py"))
+    tag_id = (await client.post("/api/tags/", json={"name": "t"})).json()["id"]
+    unused_id = (await client.post("/api/tags/", json={"name": "u"})).json()["id"]
+    for script_id in scripts.values():
+        await client.post(f"/api/scripts/{script_id}/tags/{tag_id}")
+
+    resp = await client.get(f"/api/tags/{tag_id}/scripts")
+    assert resp.status_code == 200
+    assert [s["name"] for s in resp.json()] == ["a.py", "b.py"]
+    assert (await client.get(f"/api/tags/{unused_id}/scripts")).json() == []
+
+
+@pytest.mark.asyncio
+async def test_script_tag_unknown_script_or_tag(client, tmp_path):
+    """Tagging or untagging an unknown script or tag returns 404, a repeat tag 400."""
+    scripts = await _scan_scripts(client, tmp_path, ("a.py",))
+    script_id = scripts["a.py"]
+    tag_id = (await client.post("/api/tags/", json={"name": "t"})).json()["id"]
+
+    assert (await client.post(f"/api/scripts/99999/tags/{tag_id}")).status_code == 404
+    assert (await client.post(f"/api/scripts/{script_id}/tags/99999")).status_code == 404
+    assert (await client.delete(f"/api/scripts/99999/tags/{tag_id}")).status_code == 404
+
+    assert (await client.post(f"/api/scripts/{script_id}/tags/{tag_id}")).status_code == 200
+    assert (await client.post(f"/api/scripts/{script_id}/tags/{tag_id}")).status_code == 400
+    assert (await client.delete(f"/api/scripts/{script_id}/tags/{tag_id}")).status_code == 200
+
+
 # ── Folder Roots ─────────────────────────────────────────────────────────────
 
 @pytest.mark.asyncio
@@ -77,6 +118,23 @@ async def test_create_folder_root(client, tmp_path):
     assert isinstance(data["id"], int)
 
 
+@pytest.mark.asyncio
+async def test_list_folder_roots_matches_detail(client, tmp_path):
+    """Listed roots should serialize exactly like the validated detail endpoint."""
+    create = await client.post(
+        "/api/folder-roots/",
+        json={"path": str(tmp_path), "name": "ListRoot", "enable_watch_mode": True},
+    )
+    root_id = create.json()["id"]
+    await _scan(client, root_id)
+
+    listed = (await client.get("/api/folder-roots/")).json()
+    detail = (await client.get(f"/api/folder-roots/{root_id}")).json()
+    assert listed == [detail]
+    assert detail["enable_watch_mode"] is True
+    assert detail["last_scan_time"] is not None
+
+
 @pytest.mark.asyncio
 async def test_get_folder_root(client, tmp_path):
     """Getting a folder root by ID should return its data."""
@@ -92,15 +150,32 @@ async def test_get_folder_root(client, tmp_path):
 
 @pytest.mark.asyncio
 async def test_delete_folder_root(client, tmp_path):
-    """Deleting a folder root should return 200 with a success message."""
+    """Deleting a folder root should return 204 with no body."""
     create = await client.post(
         "/api/folder-roots/",
         json={"path": str(tmp_path), "name": "DelRoot"},
     )
     root_id = create.json()["id"]
     resp = await client.delete(f"/api/folder-roots/{root_id}")
-    assert resp.status_code == 200
-    assert "deleted" in resp.json().get("message", "").lower()
+    assert resp.status_code == 204
+    assert resp.content == b""
+    assert (await client.get(f"/api/folder-roots/{root_id}")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_create_folder_root_duplicate_path(client, tmp_path):
+    """Creating a second root for the same path should return 400."""
+    payload = {"path": str(tmp_path), "name": "DupRoot"}
+    assert (await client.post("/api/folder-roots/", json=payload)).status_code == 200
+    resp = await client.post("/api/folder-roots/", json=payload)
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_delete_folder_root_not_found(client):
+    """Deleting an unknown folder root should return 404."""
+    resp = await client.delete("/api/folder-roots/99999")
+    assert resp.status_code == 404
 
 
 # ── Saved Searches ────────────────────────────────────────────────────────────
@@ -131,6 +206,59 @@ async def test_create_saved_search(client):
     assert data["is_pinned"] is True
 
 
+@pytest.mark.asyncio
+async def test_saved_search_query_params_round_trip(client):
+    """query_params should come back as the same nested object everywhere."""
+    params = {"languages": ["python", "bash"], "tags": [1, 2], "query": "déploy", "missing": None}
+    create = await client.post(
+        "/api/saved-searches/", json={"name": "Round Trip", "query_params": params}
+    )
+    search_id = create.json()["id"]
+    assert create.json()["query_params"] == params
+    assert (await client.get(f"/api/saved-searches/{search_id}")).json()["query_params"] == params
+    listed = (await client.get("/api/saved-searches/")).json()
+    assert [s["query_params"] for s in listed] == [params]
+    assert listed[0] == {**create.json(), "created_at": listed[0]["created_at"],
+                         "updated_at": listed[0]["updated_at"]}
+    assert listed[0]["is_pinned"] is False
+    assert (await client.get(f"/api/saved-searches/{search_id}")).json() == listed[0]
+    assert (await client.get("/api/saved-searches/99999")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_update_saved_search(client):
+    """Updating returns the new row; unknown ids and taken names are rejected."""
+    first = await client.post("/api/saved-searches/", json={"name": "First", "query_params": {}})
+    await client.post("/api/saved-searches/", json={"name": "Second", "query_params": {}})
+    search_id = first.json()["id"]
+
+    resp = await client.put(
+        f"/api/saved-searches/{search_id}",
+        json={"name": "Renamed", "query_params": {"q": "x"}, "is_pinned": True},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["name"] == "Renamed"
+    assert resp.json()["query_params"] == {"q": "x"}
+
+    resp = await client.put(f"/api/saved-searches/{search_id}", json={"name": "Second", "query_params": {}})
+    assert resp.status_code == 400
+    resp = await client.put("/api/saved-searches/99999", json={"name": "Nope", "query_params": {}})
+    assert resp.status_code == 404
+    assert (await client.delete("/api/saved-searches/99999")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_list_saved_searches_limit(client):
+    """Pinned searches are listed first and `limit` caps the result."""
+    for name, pinned in (("b", False), ("a", False), ("z", True)):
+        await client.post("/api/saved-searches/", json={"name": name, "query_params": {}, "is_pinned": pinned})
+    names = [s["name"] for s in (await client.get("/api/saved-searches/")).json()]
+    assert names == ["z", "a", "b"]
+    limited = (await client.get("/api/saved-searches/", params={"limit": 2})).json()
+    assert [s["name"] for s in limited] == ["z", "a"]
+    assert (await client.get("/api/saved-searches/", params={"limit": 0})).status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_delete_saved_search(client):
     """Deleting a saved search should return 200 with a success message."""
@@ -142,3 +270,783 @@ async def test_delete_saved_search(client):
     resp = await client.delete(f"/api/saved-searches/{search_id}")
     assert resp.status_code == 200
     assert "deleted" in resp.json().get("message", "").lower()
+
+
+# ── Scanning ─────────────────────────────────────────────────────────────────
+
+async def _scan(client, root_id):
+    """Run a scan (background task completes within the request) and return its status."""
+    resp = await client.post(f"/api/folder-roots/{root_id}/scan", json={})
+    assert resp.status_code == 202, resp.text
+    scan_id = resp.json()["scan_id"]
+    status = await client.get(f"/api/folder-roots/{root_id}/scan/{scan_id}")
+    assert status.status_code == 200
+    return status.json()
+
+
+@pytest.mark.asyncio
+async def test_scan_detects_new_updated_and_missing(client, tmp_path):
+    """Rescanning should report new, changed and deleted scripts."""
+    (tmp_path / "a.py").write_text("print('a')\n")
+    (tmp_path / "b.sh").write_text("echo b\n")
+    (tmp_path / "readme.txt").write_text("not a script\n")
+    create = await client.post(
+        "/api/folder-roots/", json={"path": str(tmp_path), "name": "Scan Root"}
+    )
+    root_id = create.json()["id"]
+
+    first = await _scan(client, root_id)
+    assert first["status"] == "completed"
+    assert (first["new_count"], first["updated_count"], first["deleted_count"]) == (2, 0, 0)
+
+    unchanged = await _scan(client, root_id)
+    assert (unchanged["new_count"], unchanged["updated_count"], unchanged["deleted_count"]) == (0, 0, 0)
+
+    (tmp_path / "a.py").write_text("print('a changed')\nprint('more')\n")
+    (tmp_path / "b.sh").unlink()
+    (tmp_path / "c.py").write_text("print('c')\n")
+    second = await _scan(client, root_id)
+    assert (second["new_count"], second["updated_count"], second["deleted_count"]) == (1, 1, 1)
+
+    listing = await client.get("/api/scripts/", params={"root_id": root_id})
+    scripts = {s["name"]: s for s in listing.json()["items"]}
+    assert set(scripts) == {"a.py", "c.py"}
+    detail = await client.get(f"/api/scripts/{scripts['a.py']['id']}")
+    assert detail.json()["line_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_scan_restores_missing_script(client, tmp_path):
+    """A script that reappears on disk should no longer be flagged missing."""
+    script = tmp_path / "back.py"
+    script.write_text("print('x')\n")
+    create = await client.post(
+        "/api/folder-roots/", json={"path": str(tmp_path), "name": "Restore Root"}
+    )
+    root_id = create.json()["id"]
+    await _scan(client, root_id)
+
+    content = script.read_text()
+    script.unlink()
+    assert (await _scan(client, root_id))["deleted_count"] == 1
+
+    script.write_text(content)
+    await _scan(client, root_id)
+    listing = await client.get("/api/scripts/", params={"root_id": root_id})
+    assert [s["name"] for s in listing.json()["items"]] == ["back.py"]
+
+
+@pytest.mark.asyncio
+async def test_scan_hashes_large_batches_in_worker_processes(client, tmp_path):
+    """Scans larger than one hashing chunk go through the process pool."""
+    import hashlib
+    from app.services import scanner
+
+    count = scanner.SCAN_HASH_CHUNK_SIZE + 6
+    for i in range(count):
+        (tmp_path / f"s{i}.sh").write_text(f"echo {i}\n" * (i % 3 + 1))
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "Big"})
+    status = await _scan(client, root.json()["id"])
+    assert status["new_count"] == count
+
+    scripts = (await client.get("/api/scripts/", params={"page_size": 100})).json()["items"]
+    by_name = {s["name"]: s for s in scripts}
+    detail = (await client.get(f"/api/scripts/{by_name['s5.sh']['id']}")).json()
+    assert detail["hash"] == hashlib.sha256(b"echo 5\n" * 3).hexdigest()
+    assert detail["line_count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_scan_streams_multiple_batches(client, tmp_path, monkeypatch):
+    """Counts stay correct when a scan is written in several batches."""
+    from app.services import scanner
+
+    monkeypatch.setattr(scanner, "SCAN_BATCH_SIZE", 2)
+    for i in range(5):
+        (tmp_path / f"b{i}.py").write_text(f"print({i})\n")
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "Batches"})
+    root_id = root.json()["id"]
+
+    status = await _scan(client, root_id)
+    assert (status["new_count"], status["updated_count"], status["deleted_count"]) == (5, 0, 0)
+
+    (tmp_path / "b3.py").write_text("print('changed')\nprint(3)\n")
+    (tmp_path / "b4.py").unlink()
+    status = await _scan(client, root_id)
+    assert (status["new_count"], status["updated_count"], status["deleted_count"]) == (0, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_scan_allows_writes_while_hashing(client, tmp_path, monkeypatch):
+    """Other connections can commit while a scan is hashing, and the scan still completes."""
+    import aiosqlite
+    import app.db.database as db_mod
+    import app.routes.folder_roots as folder_roots
+
+    hash_scripts = folder_roots.hash_scripts
+
+    async def _hash_with_concurrent_write(scripts):
+        # A short timeout fails fast if the scan is holding the write lock
+        async with aiosqlite.connect(db_mod.DB_PATH, timeout=0.1) as other:
+            await other.execute("INSERT INTO tags (name) VALUES (?)", (f"t{len(scripts)}",))
+            await other.commit()
+        await hash_scripts(scripts)
+
+    monkeypatch.setattr(folder_roots, "hash_scripts", _hash_with_concurrent_write)
+    (tmp_path / "a.py").write_text("print(1)\n")
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "Busy"})
+
+    status = await _scan(client, root.json()["id"])
+    assert status["status"] == "completed"
+    assert status["new_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_scans_of_different_roots_overlap(client, tmp_path, monkeypatch):
+    """A scan of one root can finish while another root's scan is still hashing."""
+    import asyncio
+    import app.routes.folder_roots as folder_roots
+
+    hash_scripts = folder_roots.hash_scripts
+    slow_hashing = asyncio.Event()
+    other_done = asyncio.Event()
+
+    async def _hash_waiting_for_other_root(scripts):
+        await hash_scripts(scripts)
+        if scripts and "slow" in scripts[0]["path"]:
+            slow_hashing.set()
+            # Only returns if the other root's scan gets the writer meanwhile
+            await asyncio.wait_for(other_done.wait(), 5)
+
+    monkeypatch.setattr(folder_roots, "hash_scripts", _hash_waiting_for_other_root)
+    root_ids = {}
+    for name in ("slow", "fast"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / f"{name}.py").write_text("print(1)\n")
+        root = await client.post(
+            "/api/folder-roots/", json={"path": str(tmp_path / name), "name": name}
+        )
+        root_ids[name] = root.json()["id"]
+
+    async def _scan_fast():
+        await slow_hashing.wait()
+        status = await _scan(client, root_ids["fast"])
+        other_done.set()
+        return status
+
+    slow, fast = await asyncio.gather(_scan(client, root_ids["slow"]), _scan_fast())
+    assert slow["status"] == fast["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_scan_failing_midway_keeps_written_batches(client, tmp_path, monkeypatch):
+    """A scan failing after some batches keeps them, records their counts and marks nothing missing."""
+    from app.services import scanner
+    import app.routes.folder_roots as folder_roots
+
+    monkeypatch.setattr(scanner, "SCAN_BATCH_SIZE", 2)
+    for i in range(5):
+        (tmp_path / f"b{i}.py").write_text(f"print({i})\n")
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "Fail"})
+    root_id = root.json()["id"]
+    assert (await _scan(client, root_id))["new_count"] == 5
+
+    hash_scripts = folder_roots.hash_scripts
+    calls = 0
+
+    async def _hash_failing_on_second_batch(scripts):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise OSError("disk went away")
+        await hash_scripts(scripts)
+
+    monkeypatch.setattr(folder_roots, "hash_scripts", _hash_failing_on_second_batch)
+    (tmp_path / "b4.py").unlink()
+    for i in range(5, 9):
+        (tmp_path / f"b{i}.py").write_text(f"print({i})\n")
+    status = await _scan(client, root_id)
+    assert status["status"] == "failed"
+    assert "disk went away" in status["error_message"]
+    assert "not marked" in status["error_message"]
+
+    # Only the first batch was written, and b4.py was not marked missing
+    scripts = (await client.get("/api/scripts/", params={"root_id": root_id})).json()
+    assert scripts["total"] == 5 + status["new_count"]
+    assert status["new_count"] < 4
+    assert "b4.py" in {s["name"] for s in scripts["items"]}
+
+
+@pytest.mark.asyncio
+async def test_scan_skips_hashing_unchanged_size_and_mtime(client, tmp_path):
+    """Files with unchanged size and mtime are not rehashed unless full_scan is set."""
+    import os
+
+    script = tmp_path / "same.sh"
+    script.write_text("echo aaaa\n")
+    stat = script.stat()
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "Quick"})
+    root_id = root.json()["id"]
+    await _scan(client, root_id)
+
+    # Same size, same mtime, different content
+    script.write_text("echo bbbb\n")
+    os.utime(script, (stat.st_atime, stat.st_mtime))
+
+    status = await _scan(client, root_id)
+    assert status["updated_count"] == 0
+
+    resp = await client.post(f"/api/folder-roots/{root_id}/scan", json={"full_scan": True})
+    status = await client.get(f"/api/folder-roots/{root_id}/scan/{resp.json()['scan_id']}")
+    assert status.json()["updated_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_scan_of_vanished_root_fails(client, tmp_path):
+    """A scan whose root directory is gone should be recorded as failed."""
+    root_dir = tmp_path / "gone"
+    root_dir.mkdir()
+    root = await client.post("/api/folder-roots/", json={"path": str(root_dir), "name": "Gone"})
+    root_dir.rmdir()
+    status = await _scan(client, root.json()["id"])
+    assert status["status"] == "failed"
+    assert "does not exist" in status["error_message"]
+
+
+@pytest.mark.asyncio
+async def test_scan_status_not_found(client, tmp_path):
+    """Unknown roots and unknown scans are reported separately."""
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "S"})
+    root_id = root.json()["id"]
+    resp = await client.get(f"/api/folder-roots/{root_id}/scan/99999")
+    assert resp.status_code == 404
+    assert resp.json()["detail"] == "Scan not found"
+    resp = await client.get("/api/folder-roots/99999/scan/1")
+    assert resp.status_code == 404
+    assert resp.json()["detail"] == "Folder root not found"
+
+
+@pytest.mark.asyncio
+async def test_scan_status_reports_live_progress(client, tmp_path):
+    """A running scan should report the in-flight counters, not zeros."""
+    import aiosqlite
+    import app.db.database as db_mod
+    import app.routes.folder_roots as fr_mod
+
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "P"})
+    root_id = root.json()["id"]
+    async with aiosqlite.connect(db_mod.DB_PATH) as db:
+        cursor = await db.execute(
+            "INSERT INTO scan_events (root_id, started_at, status) VALUES (?, CURRENT_TIMESTAMP, 'running')",
+            (root_id,),
+        )
+        scan_id = cursor.lastrowid
+        await db.commit()
+
+    fr_mod._scan_progress[scan_id] = {"new_count": 3, "updated_count": 1, "deleted_count": 0}
+    try:
+        status = (await client.get(f"/api/folder-roots/{root_id}/scan/{scan_id}")).json()
+    finally:
+        fr_mod._scan_progress.pop(scan_id, None)
+    assert status["status"] == "running"
+    assert (status["new_count"], status["updated_count"]) == (3, 1)
+
+
+# ── Scripts ──────────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_list_scripts_tags(client, tmp_path):
+    """Each listed script carries its own tags, sorted by name."""
+    for name in ("a.py", "b.py", "c.sh"):
+        (tmp_path / name).write_text("echo 1\n")
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "S"})
+    await _scan(client, root.json()["id"])
+    scripts = {s["name"]: s["id"] for s in (await client.get("/api/scripts/")).json()["items"]}
+    for tag in ("zeta", "alpha"):
+        tag_id = (await client.post("/api/tags/", json={"name": tag})).json()["id"]
+        await client.post(f"/api/scripts/{scripts['a.py']}/tags/{tag_id}")
+
+    resp = await client.get("/api/scripts/", params={"page_size": 2})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total"] == 3 and data["total_pages"] == 2
+    assert [(s["name"], s["tags"]) for s in data["items"]] == [
+        ("a.py", ["alpha", "zeta"]), ("b.py", []),
+    ]
+    page2 = (await client.get("/api/scripts/", params={"page_size": 2, "page": 2})).json()
+    assert [(s["name"], s["tags"]) for s in page2["items"]] == [("c.sh", [])]
+
+
+@pytest.mark.asyncio
+async def test_export_scripts_related_data(client, tmp_path):
+    """Export attaches each script's own tags, status, notes and custom fields."""
+    for name in ("a.py", "b.py"):
+        (tmp_path / name).write_text("print(1)\n")
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "E"})
+    await _scan(client, root.json()["id"])
+    scripts = {s["name"]: s["id"] for s in (await client.get("/api/scripts/")).json()["items"]}
+    a_id = scripts["a.py"]
+    tag_id = (await client.post("/api/tags/", json={"name": "ops", "color": "#fff"})).json()["id"]
+    await client.post(f"/api/scripts/{a_id}/tags/{tag_id}")
+    await client.put(f"/api/scripts/{a_id}/status", json={"status": "deprecated", "owner": "me"})
+    await client.post(f"/api/notes/script/{a_id}", json={"content": "hello"})
+    await client.put(f"/api/scripts/{a_id}/fields/team", json={"value": "infra"})
+
+    resp = await client.post("/api/scripts/export", json=[])
+    assert resp.status_code == 200
+    exported = {s["name"]: s for s in resp.json()["scripts"]}
+    assert resp.json()["script_count"] == 2
+    a = exported["a.py"]
+    assert a["tags"] == [{"name": "ops", "group_name": None, "color": "#fff"}]
+    assert a["status"]["status"] == "deprecated" and a["status"]["owner"] == "me"
+    assert [n["content"] for n in a["notes"]] == ["hello"]
+    assert a["custom_fields"] == {"team": "infra"}
+    b = exported["b.py"]
+    assert (b["tags"], b["status"], b["notes"], b["custom_fields"]) == ([], None, [], {})
+
+    only_b = (await client.post("/api/scripts/export", json=[scripts["b.py"]])).json()
+    assert [s["name"] for s in only_b["scripts"]] == ["b.py"]
+
+
+async def _scan_scripts(client, tmp_path, names):
+    """Create and scan script files, returning a name -> id map."""
+    for name in names:
+        (tmp_path / name).write_text("print(1)\n")
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "B"})
+    await _scan(client, root.json()["id"])
+    return {s["name"]: s["id"] for s in (await client.get("/api/scripts/")).json()["items"]}
+
+
+@pytest.mark.asyncio
+async def test_bulk_add_tags(client, tmp_path):
+    """Bulk tagging adds new pairs and counts missing scripts and existing pairs as skipped."""
+    scripts = await _scan_scripts(client, tmp_path, ("a.py", "b.py"))
+    a_id, b_id = scripts["a.py"], scripts["b.py"]
+    tag_ids = [(await client.post("/api/tags/", json={"name": n})).json()["id"] for n in ("x", "y")]
+    await client.post(f"/api/scripts/{a_id}/tags/{tag_ids[0]}")
+
+    resp = await client.post(
+        "/api/scripts/bulk/tags",
+        json={"script_ids": [a_id, b_id, 99999], "tag_ids": tag_ids},
+    )
+    assert resp.status_code == 200
+    assert (resp.json()["added"], resp.json()["skipped"]) == (3, 2)
+    for script_id in (a_id, b_id):
+        detail = (await client.get(f"/api/scripts/{script_id}")).json()
+        assert sorted(detail["tags"]) == ["x", "y"]
+    history = (await client.get(f"/api/scripts/{b_id}/history")).json()
+    assert sorted(h["new_value"] for h in history if h["change_type"] == "tag_added_bulk") == ["x", "y"]
+
+
+@pytest.mark.asyncio
+async def test_update_script_status_logs_changes(client, tmp_path):
+    """Each field set in a status update is logged with its previous value."""
+    a_id = (await _scan_scripts(client, tmp_path, ("a.py",)))["a.py"]
+    await client.put(f"/api/scripts/{a_id}/status", json={"status": "active", "owner": "ann"})
+    resp = await client.put(f"/api/scripts/{a_id}/status", json={"status": "deprecated", "environment": "prod"})
+    assert resp.status_code == 200
+    assert (await client.put("/api/scripts/99999/status", json={"status": "active"})).status_code == 404
+
+    a = (await client.get(f"/api/scripts/{a_id}")).json()
+    assert (a["status"], a["owner"], a["environment"]) == ("deprecated", "ann", "prod")
+    history = (await client.get(f"/api/scripts/{a_id}/history")).json()
+    assert sorted((h["change_type"], h["old_value"], h["new_value"]) for h in history) == [
+        ("environment_changed", None, "prod"),
+        ("owner_changed", "none", "ann"),
+        ("status_changed", "active", "deprecated"),
+        ("status_changed", "none", "active"),
+    ]
+
+    # History pages newest first, continuing before the last entry seen
+    first = (await client.get(f"/api/scripts/{a_id}/history", params={"limit": 3})).json()
+    rest = (await client.get(f"/api/scripts/{a_id}/history", params={"before": first[-1]["id"]})).json()
+    assert [h["id"] for h in first + rest] == sorted((h["id"] for h in history), reverse=True)
+    assert len(rest) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_status(client, tmp_path):
+    """Bulk status updates existing and new status rows and skips unknown scripts."""
+    scripts = await _scan_scripts(client, tmp_path, ("a.py", "b.py"))
+    a_id, b_id = scripts["a.py"], scripts["b.py"]
+    await client.put(f"/api/scripts/{a_id}/status", json={"status": "active", "owner": "ann"})
+
+    resp = await client.post(
+        "/api/scripts/bulk/status",
+        json={"script_ids": [a_id, b_id, 99999], "status": "deprecated", "environment": "prod"},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["updated"] == 2
+    a = (await client.get(f"/api/scripts/{a_id}")).json()
+    assert (a["status"], a["owner"], a["environment"]) == ("deprecated", "ann", "prod")
+    b = (await client.get(f"/api/scripts/{b_id}")).json()
+    assert (b["status"], b["owner"], b["environment"]) == ("deprecated", None, "prod")
+    history = (await client.get(f"/api/scripts/{b_id}/history")).json()
+    assert [h["new_value"] for h in history if h["change_type"] == "status_changed_bulk"] == ["deprecated"]
+
+
+@pytest.mark.asyncio
+async def test_import_scripts_merge(client, tmp_path):
+    """Merge imports attach tags, status and notes to scripts matched by path."""
+    scripts = await _scan_scripts(client, tmp_path, ("a.py",))
+    a_id = scripts["a.py"]
+    export = (await client.post("/api/scripts/export", json=[])).json()
+    existing = (await client.post("/api/tags/", json={"name": "old"})).json()["id"]
+    await client.post(f"/api/scripts/{a_id}/tags/{existing}")
+    export["scripts"][0].update(
+        tags=[{"name": "old"}, {"name": "new", "color": "#000"}],
+        status={"status": "deprecated"},
+        notes=[{"content": "imported", "is_markdown": True}],
+    )
+    export["scripts"].append({"path": str(tmp_path / "gone.py")})
+
+    resp = await client.post("/api/scripts/import", params={"conflict_resolution": "merge"}, json=export)
+    assert resp.status_code == 200
+    assert (resp.json()["updated"], resp.json()["skipped"]) == (1, 1)
+    detail = (await client.get(f"/api/scripts/{a_id}")).json()
+    assert sorted(detail["tags"]) == ["new", "old"]
+    assert (detail["status"], detail["notes"]) == ("deprecated", "imported")
+    notes = (await client.get(f"/api/notes/script/{a_id}")).json()
+    assert [(n["content"], n["is_markdown"]) for n in notes] == [("imported", True)]
+
+    resp = await client.post("/api/scripts/import", json=export)
+    assert (resp.json()["updated"], resp.json()["skipped"]) == (0, 2)
+
+
+@pytest.mark.asyncio
+async def test_import_scripts_non_string_tag_names(client, tmp_path):
+    """Imported tag names are normalised to trimmed strings, so numeric names work."""
+    a_id = (await _scan_scripts(client, tmp_path, ("a.py",)))["a.py"]
+    export = (await client.post("/api/scripts/export", json=[])).json()
+    export["scripts"][0]["tags"] = [{"name": 1}, {"name": " spaced "}, {"name": "  "}]
+
+    resp = await client.post("/api/scripts/import", params={"conflict_resolution": "merge"}, json=export)
+    assert resp.status_code == 200
+    assert resp.json()["updated"] == 1
+    assert sorted((await client.get(f"/api/scripts/{a_id}")).json()["tags"]) == ["1", "spaced"]
+
+
+@pytest.mark.asyncio
+async def test_script_custom_fields_and_history(client, tmp_path):
+    """Custom fields and history work for known scripts and 404 for unknown ones."""
+    a_id = (await _scan_scripts(client, tmp_path, ("a.py",)))["a.py"]
+    assert (await client.get(f"/api/scripts/{a_id}/history")).json() == []
+    assert (await client.get(f"/api/scripts/{a_id}/fields")).json() == {}
+
+    await client.put(f"/api/scripts/{a_id}/fields/team", json={"value": "infra"})
+    await client.put(f"/api/scripts/{a_id}/fields/team", json={"value": "ops"})
+    await client.put(f"/api/scripts/{a_id}/fields/tier", json={"value": "1"})
+    assert (await client.get(f"/api/scripts/{a_id}/fields")).json() == {"team": "ops", "tier": "1"}
+    assert (await client.delete(f"/api/scripts/{a_id}/fields/tier")).status_code == 200
+    assert (await client.get(f"/api/scripts/{a_id}/fields")).json() == {"team": "ops"}
+    history = (await client.get(f"/api/scripts/{a_id}/history")).json()
+    assert sorted(h["change_type"] for h in history) == [
+        "custom_field_deleted", "custom_field_updated", "custom_field_updated", "custom_field_updated",
+    ]
+
+    assert (await client.get("/api/scripts/99999/history")).status_code == 404
+    assert (await client.get("/api/scripts/99999/fields")).status_code == 404
+    assert (await client.put("/api/scripts/99999/fields/k", json={"value": "v"})).status_code == 404
+    assert (await client.delete("/api/scripts/99999/fields/k")).status_code == 404
+    assert (await client.put("/api/scripts/99999/status", json={"status": "x"})).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_tag_changes_logged_by_name(client, tmp_path):
+    """Adding and removing a tag logs the tag's name in the script history."""
+    a_id = (await _scan_scripts(client, tmp_path, ("a.py",)))["a.py"]
+    tag_id = (await client.post("/api/tags/", json={"name": "infra"})).json()["id"]
+    assert (await client.post(f"/api/scripts/{a_id}/tags/{tag_id}")).status_code == 200
+    assert (await client.post(f"/api/scripts/{a_id}/tags/{tag_id}")).status_code == 400
+    assert (await client.delete(f"/api/scripts/{a_id}/tags/{tag_id}")).status_code == 200
+    history = (await client.get(f"/api/scripts/{a_id}/history")).json()
+    logged = sorted((h["change_type"], h["old_value"], h["new_value"]) for h in history)
+    assert logged == [("tag_added", None, "infra"), ("tag_removed", "infra", None)]
+
+
+@pytest.mark.asyncio
+async def test_list_scripts_cache_invalidated_by_writes(client, tmp_path):
+    """Listings are served from cache until a catalogue write bumps the version."""
+    import aiosqlite
+    import app.db.database as db_mod
+
+    a_id = (await _scan_scripts(client, tmp_path, ("a.py",)))["a.py"]
+    assert (await client.get("/api/scripts/")).json()["items"][0]["status"] is None
+
+    # A write that bypasses the API is not seen while the cached page is fresh
+    async with aiosqlite.connect(db_mod.DB_PATH) as db:
+        await db.execute("UPDATE scripts SET name = 'renamed.py' WHERE id = ?", (a_id,))
+        await db.commit()
+    assert (await client.get("/api/scripts/")).json()["items"][0]["name"] == "a.py"
+
+    await client.put(f"/api/scripts/{a_id}/status", json={"status": "deprecated"})
+    item = (await client.get("/api/scripts/")).json()["items"][0]
+    assert (item["name"], item["status"]) == ("renamed.py", "deprecated")
+
+
+@pytest.mark.asyncio
+async def test_list_scripts_keyset_pagination(client, tmp_path):
+    """Following next_cursor walks every script once, in order, including NULL sort values."""
+    scripts = await _scan_scripts(client, tmp_path, ("a.py", "b.py", "c.py", "d.py", "e.py"))
+    for name in ("b.py", "d.py"):
+        await client.put(f"/api/scripts/{scripts[name]}/status", json={"status": "active"})
+
+    for sort_by, sort_order in (("name", "asc"), ("name", "desc"), ("status", "asc"), ("status", "desc")):
+        params = {"page_size": 2, "sort_by": sort_by, "sort_order": sort_order}
+        expected = [s["id"] for s in (await client.get("/api/scripts/", params={**params, "page_size": 10})).json()["items"]]
+        seen, after = [], None
+        while True:
+            page = (await client.get("/api/scripts/", params={**params, **({"after": after} if after else {})})).json()
+            assert page["total"] == 5
+            seen += [s["id"] for s in page["items"]]
+            after = page["next_cursor"]
+            if not after:
+                break
+        assert seen == expected
+
+    active = (await client.get("/api/scripts/", params={"status": "active"})).json()
+    assert active["total"] == 2 and sorted(s["name"] for s in active["items"]) == ["b.py", "d.py"]
+    assert (await client.get("/api/scripts/", params={"after": "not-a-cursor"})).status_code == 400
+    non_scalar = base64.urlsafe_b64encode(json.dumps([[1], 1]).encode()).decode()
+    assert (await client.get("/api/scripts/", params={"after": non_scalar})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_search_scripts_by_tags(client, tmp_path):
+    """Searching by tags matches scripts with any of them, counted once, with all their tags."""
+    scripts = await _scan_scripts(client, tmp_path, ("a.py", "b.py", "c.py"))
+    tag_ids = {n: (await client.post("/api/tags/", json={"name": n})).json()["id"] for n in ("x", "y,z")}
+    for name, tags in (("a.py", ("x", "y,z")), ("b.py", ("y,z",))):
+        for tag in tags:
+            await client.post(f"/api/scripts/{scripts[name]}/tags/{tag_ids[tag]}")
+
+    resp = await client.post("/api/search/", json={"tags": ["x", "y,z"]})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total"] == 2
+    assert [(s["name"], s["tags"]) for s in data["items"]] == [("a.py", ["x", "y,z"]), ("b.py", ["y,z"])]
+
+
+@pytest.mark.asyncio
+async def test_search_scripts_by_status_columns(client, tmp_path):
+    """Filters on script_status columns join it for the count as well as the page."""
+    scripts = await _scan_scripts(client, tmp_path, ("a.py", "b.py"))
+    await client.put(f"/api/scripts/{scripts['a.py']}/status", json={"status": "active", "owner": "ann"})
+
+    for filters in ({"owner": "ann"}, {"status": ["active"]}, {"classification": "none"}):
+        data = (await client.post("/api/search/", json=filters)).json()
+        expected = [] if "classification" in filters else ["a.py"]
+        assert (data["total"], [s["name"] for s in data["items"]]) == (len(expected), expected)
+
+
+@pytest.mark.asyncio
+async def test_list_duplicates(client, tmp_path):
+    """Scripts sharing a hash are grouped with their paths and ids, even with '|' in a path."""
+    scripts = await _scan_scripts(client, tmp_path, ("a|b.py", "c.py"))
+    resp = await client.get("/api/scripts/duplicates/list")
+    assert resp.status_code == 200
+    assert (resp.json()["total"], resp.json()["limit"]) == (1, 200)
+    [group] = resp.json()["items"]
+    assert group["count"] == 2
+    assert sorted(group["paths"]) == sorted(str(tmp_path / n) for n in ("a|b.py", "c.py"))
+    assert sorted(group["ids"]) == sorted(scripts.values())
+    past_end = (await client.get("/api/scripts/duplicates/list", params={"offset": 1})).json()
+    assert (past_end["items"], past_end["total"]) == ([], 1)
+    assert (await client.get("/api/scripts/duplicates/list", params={"limit": 1001})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_get_script_content(client, tmp_path, monkeypatch):
+    """Script content is read from disk, with 413 for oversized and 404 for vanished files."""
+    import app.routes.scripts as scripts_mod
+
+    a_id = (await _scan_scripts(client, tmp_path, ("a.py",)))["a.py"]
+    resp = await client.get(f"/api/scripts/{a_id}/content")
+    assert resp.status_code == 200
+    assert resp.json() == {"content": "print(1)\n", "path": str(tmp_path / "a.py")}
+
+    monkeypatch.setattr(scripts_mod, "SCRIPT_CONTENT_MAX_BYTES", 4)
+    assert (await client.get(f"/api/scripts/{a_id}/content")).status_code == 413
+    (tmp_path / "a.py").unlink()
+    assert (await client.get(f"/api/scripts/{a_id}/content")).status_code == 404
+
+
+
+@pytest.mark.asyncio
+async def test_get_script_content_outside_root(client, tmp_path):
+    """A stored path in a sibling directory sharing the root's prefix is refused."""
+    import aiosqlite
+    import app.db.database as db_mod
+
+    root_dir, sibling = tmp_path / "root", tmp_path / "root2"
+    root_dir.mkdir()
+    sibling.mkdir()
+    (sibling / "b.py").write_text("secret\n")
+    root_id = (await client.post("/api/folder-roots/", json={"path": str(root_dir), "name": "R"})).json()["id"]
+    async with aiosqlite.connect(db_mod.DB_PATH) as db:
+        cursor = await db.execute(
+            "INSERT INTO scripts (root_id, path, name) VALUES (?, ?, 'b.py')",
+            (root_id, str(sibling / "b.py"))
+        )
+        script_id = cursor.lastrowid
+        await db.commit()
+    assert (await client.get(f"/api/scripts/{script_id}/content")).status_code == 403
+
+
+# ── Notes ────────────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_note_lifecycle(client, tmp_path):
+    """Notes can be created, updated and deleted for a scanned script."""
+    (tmp_path / "a.py").write_text("print(1)\n")
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "N"})
+    await _scan(client, root.json()["id"])
+    script_id = (await client.get("/api/scripts/")).json()["items"][0]["id"]
+
+    resp = await client.post(f"/api/notes/script/{script_id}", json={"content": "first"})
+    assert resp.status_code == 200
+    note = resp.json()
+    assert note["script_id"] == script_id
+    assert note["content"] == "first"
+    assert (await client.get(f"/api/notes/script/{script_id}")).json() == [note]
+
+    resp = await client.put(f"/api/notes/{note['id']}", json={"content": "second"})
+    assert resp.status_code == 200
+    assert resp.json()["content"] == "second"
+    history = (await client.get(f"/api/scripts/{script_id}/history")).json()
+    updates = [h for h in history if h["change_type"] == "note_updated"]
+    assert [(h["old_value"], h["new_value"]) for h in updates] == [("first", "second")]
+
+    assert (await client.delete(f"/api/notes/{note['id']}")).status_code == 200
+    history = (await client.get(f"/api/scripts/{script_id}/history")).json()
+    assert [h["old_value"] for h in history if h["change_type"] == "note_deleted"] == ["second"]
+    assert (await client.delete(f"/api/notes/{note['id']}")).status_code == 404
+    assert (await client.put(f"/api/notes/{note['id']}", json={"content": "x"})).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_create_note_unknown_script(client):
+    """Creating a note for a missing script should return 404."""
+    resp = await client.post("/api/notes/script/99999", json={"content": "orphan"})
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_render_note_reflects_updates(client, tmp_path):
+    """Rendered notes are cached, but an update is never served stale."""
+    (tmp_path / "a.py").write_text("print(1)\n")
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "R"})
+    await _scan(client, root.json()["id"])
+    script_id = (await client.get("/api/scripts/")).json()["items"][0]["id"]
+    note = (await client.post(
+        f"/api/notes/script/{script_id}", json={"content": "# Old", "is_markdown": True}
+    )).json()
+
+    for _ in range(2):
+        resp = await client.get(f"/api/notes/{note['id']}/render")
+        assert resp.status_code == 200
+        assert "Old" in resp.json()["html"]
+
+    # Same-second update: the cache key must still change
+    await client.put(f"/api/notes/{note['id']}", json={"content": "# New", "is_markdown": True})
+    html = (await client.get(f"/api/notes/{note['id']}/render")).json()["html"]
+    assert "New" in html and "Old" not in html
+    assert (await client.get("/api/notes/99999/render")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_preview_markdown_blank_content(client):
+    """Blank previews return empty output; real content is rendered and escaped."""
+    resp = await client.post("/api/notes/preview", json={"content": "  \n", "is_markdown": True})
+    assert resp.json() == {"html": "", "is_markdown": True, "preview": ""}
+    resp = await client.post("/api/notes/preview", json={"content": "**hi**", "is_markdown": True})
+    assert "<strong>hi</strong>" in resp.json()["html"]
+    resp = await client.post("/api/notes/preview", json={"content": "<script>x</script>"})
+    assert resp.json()["html"] == "<pre>&lt;script&gt;x&lt;/script&gt;</pre>"
+
+
+# ── Folders ──────────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_list_folders_keyset_pagination(client, tmp_path):
+    """Folders are listed by path and can be paged with the `after` cursor."""
+    import aiosqlite
+    import app.db.database as db_mod
+
+    root = await client.post("/api/folder-roots/", json={"path": str(tmp_path), "name": "F"})
+    root_id = root.json()["id"]
+    async with aiosqlite.connect(db_mod.DB_PATH) as db:
+        await db.executemany(
+            "INSERT INTO folders (root_id, path) VALUES (?, ?)",
+            [(root_id, f"{tmp_path}/{name}") for name in ("c", "a", "b")],
+        )
+        await db.commit()
+
+    first = await client.get("/api/folders/", params={"limit": 2})
+    assert first.status_code == 200
+    page = first.json()
+    assert [f["path"].rsplit("/", 1)[1] for f in page] == ["a", "b"]
+    assert "T" in page[0]["created_at"]
+
+    rest = await client.get("/api/folders/", params={"limit": 2, "after": page[-1]["path"]})
+    assert [f["path"].rsplit("/", 1)[1] for f in rest.json()] == ["c"]
+    assert len((await client.get("/api/folders/")).json()) == 3
+
+
+# ── Full-Text Search ─────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_fts_search_ranks_and_filters_columns(client, tmp_path):
+    """FTS results carry metadata and a snippet, and honour the column flags."""
+    (tmp_path / "deploy.sh").write_text("#!/bin/bash\nkubectl rollout restart deployment\n")
+    (tmp_path / "other.py").write_text("print('nothing to see')\n")
+    root = await client.post(
+        "/api/folder-roots/",
+        json={"path": str(tmp_path), "name": "FTS", "enable_content_indexing": True},
+    )
+    root_id = root.json()["id"]
+    await _scan(client, root_id)
+    rebuild = await client.post("/api/fts/rebuild")
+    assert rebuild.status_code == 200
+    assert rebuild.json()["indexed_count"] == 2
+
+    resp = await client.post("/api/fts/", json={"query": "kubectl"})
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["total"] == 1
+    item = data["items"][0]
+    assert item["name"] == "deploy.sh"
+    assert item["extension"] == ".sh"
+    assert "**kubectl**" in item["snippet"]
+
+    resp = await client.post("/api/fts/", json={"query": "kubectl", "search_content": False})
+    assert resp.json()["total"] == 0
+
+
+@pytest.mark.asyncio
+async def test_fts_rebuild_without_content_indexing(client, tmp_path):
+    """Roots without content indexing are indexed by metadata and notes only."""
+    import aiosqlite
+    import app.db.database as db_mod
+
+    (tmp_path / "cleanup.py").write_text("import shutil  # rmtree everything\n")
+    root = await client.post(
+        "/api/folder-roots/",
+        json={"path": str(tmp_path), "name": "Meta", "enable_content_indexing": False},
+    )
+    root_id = root.json()["id"]
+    await _scan(client, root_id)
+    script_id = (await client.get("/api/scripts/")).json()["items"][0]["id"]
+    await client.post(f"/api/notes/script/{script_id}", json={"content": "nightly janitor"})
+
+    rebuild = await client.post("/api/fts/rebuild", params={"root_id": root_id})
+    assert rebuild.json()["indexed_count"] == 1
+
+    assert (await client.post("/api/fts/", json={"query": "janitor"})).json()["total"] == 1
+    assert (await client.post("/api/fts/", json={"query": "rmtree"})).json()["total"] == 0
+
+    # A NULL flag is treated as disabled rather than dropping the root's scripts
+    async with aiosqlite.connect(db_mod.DB_PATH) as db:
+        await db.execute("UPDATE folder_roots SET enable_content_indexing = NULL")
+        await db.commit()
+    assert (await client.post("/api/fts/rebuild")).json()["indexed_count"] == 1
@@ -28,7 +28,7 @@ export const scriptsApi = {
   updateStatus: (id, data) => api.put(`/scripts/${id}/status`, data),
   addTag: (scriptId, tagId) => api.post(`/scripts/${scriptId}/tags/${tagId}`),
   removeTag: (scriptId, tagId) => api.delete(`/scripts/${scriptId}/tags/${tagId}`),
-  getDuplicates: () => api.get('/scripts/duplicates/list'),
+  getDuplicates: (params) => api.get('/scripts/duplicates/list', { params }),
 };
 
 // Tags API